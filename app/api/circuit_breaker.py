@@ -0,0 +1,105 @@
+"""
+In-process circuit breaker for calls to an upstream dependency.
+"""
+
+import logging
+import time
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is down instead of retrying every request.
+    
+    States:
+    - CLOSED: calls go through; consecutive failures are counted
+    - OPEN: after failure_threshold consecutive failures, calls are refused
+      until reset_timeout seconds have passed
+    - HALF_OPEN: after the timeout, a single probe call goes through at a
+      time; its success closes the breaker and its failure reopens it
+    
+    Every call let through must end in record_success(), record_failure()
+    or release(), so a half-open probe slot is never left taken.
+    
+    Not thread-safe; meant to be used from a single event loop.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the breaker in the CLOSED state.
+        
+        Args:
+            name: Upstream name used in log messages
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before letting calls through again
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        """Current breaker state."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow_request(self) -> bool:
+        """Whether a call may go to the upstream right now; takes the probe slot when half-open."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN or self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+    
+    def release(self) -> None:
+        """End an allowed call that says nothing about upstream health (frees the probe slot)."""
+        self._probe_in_flight = False
+    
+    def record_success(self) -> None:
+        """Record a call the upstream answered; closes the breaker."""
+        if self._opened_at is not None:
+            logger.info(f"Circuit breaker for {self.name} closed")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Record a failed call; opens the breaker at the threshold or when half-open."""
+        self._probe_in_flight = False
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    f"Circuit breaker for {self.name} opened after {self._failures} consecutive failures",
+                    extra={"failures": self._failures, "reset_timeout": self.reset_timeout}
+                )
+            self._opened_at = self._clock()
+    
+    def reset(self) -> None:
+        """Return to the CLOSED state with no recorded failures."""
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
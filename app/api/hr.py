@@ -2,18 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import JSONResponse
 import logging
 import uuid
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    retry_if_not_exception_type,
-    before_sleep_log,
-    after_log
-)
 
 from ..schemas import HRUserIn, EnrichedUser, WebhookAcceptedResponse
-from ..services.okta_loader import load_okta_user_by_email
+from ..services.okta_fetch import fetch_okta_data
 from ..dependencies import get_user_store, get_kafka_producer
 from ..store import UserStore
 from ..services.kafka_service import UserEnrichmentProducer
@@ -22,6 +13,7 @@ from ..exceptions import (
     OktaAPIError,
     OktaUserNotFoundError,
     OktaConfigurationError,
+    OktaCircuitOpenError,
     UserOnboardingError
 )
 
@@ -32,43 +24,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/hr", tags=["hr"])
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=30),
-    # Retry on OktaAPIError, ConnectionError, TimeoutError
-    # BUT exclude OktaUserNotFoundError and OktaConfigurationError (which are subclasses of OktaAPIError)
-    retry=(
-        retry_if_exception_type((OktaAPIError, ConnectionError, TimeoutError)) &
-        retry_if_not_exception_type((OktaUserNotFoundError, OktaConfigurationError))
-    ),
-    before_sleep=before_sleep_log(logger, logging.WARNING),
-    after=after_log(logger, logging.INFO)
-)
-async def fetch_okta_data_with_retry(email: str):
-    """
-    Fetch Okta user data with automatic retry on transient failures.
-    
-    Retry Strategy:
-    - Attempts: Up to 3 attempts
-    - Wait time: Exponential backoff (2s, 4s, 8s, max 30s)
-    - Retry on: OktaAPIError, ConnectionError, TimeoutError
-    - No retry on: OktaUserNotFoundError, OktaConfigurationError
-    
-    Args:
-        email: User email address to search for
-        
-    Returns:
-        OktaUser object if found
-        
-    Raises:
-        OktaUserNotFoundError: User not found (no retry)
-        OktaConfigurationError: Configuration error (no retry)
-        OktaAPIError: API error after all retries exhausted
-    """
-    logger.debug(f"Attempting to fetch Okta data for {email}")
-    return await load_okta_user_by_email(email)
-
-
 async def process_user_enrichment(hr_user: HRUserIn, store: UserStore) -> None:
     """
     Background task to enrich HR user data with Okta information.
@@ -90,8 +45,9 @@ async def process_user_enrichment(hr_user: HRUserIn, store: UserStore) -> None:
     
     try:
         # Fetch Okta data with automatic retry on transient failures
-        # Will retry up to 3 times with exponential backoff (2s, 4s, 8s)
-        okta_data = await fetch_okta_data_with_retry(email)
+        # Will retry up to 3 times with exponential backoff (2s, 4s, 8s),
+        # unless the circuit breaker is open because Okta keeps failing
+        okta_data = await fetch_okta_data(email)
         
         # Merge HR and Okta data
         enriched = EnrichedUser.from_sources(hr=hr_user, okta=okta_data)
@@ -122,6 +78,12 @@ async def process_user_enrichment(hr_user: HRUserIn, store: UserStore) -> None:
             extra=scrub_pii({"employee_id": employee_id, "error": str(e)})
         )
         
+    except OktaCircuitOpenError as e:
+        logger.error(
+            "Background enrichment skipped: Okta circuit breaker open",
+            extra=scrub_pii({"employee_id": employee_id, "email": email, "error": str(e)})
+        )
+        
     except OktaAPIError as e:
         logger.error(
             "Background enrichment failed: Okta API error after retries",
@@ -1,5 +1,6 @@
 
 import os
+from functools import lru_cache
 from typing import Literal, Optional
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
@@ -46,6 +47,13 @@ class Settings(BaseSettings):
         validation_alias="API_TIMEOUT_SECONDS"
     )
     
+    okta_max_concurrency: int = Field(
+        default=14,
+        ge=1,
+        description="Maximum in-flight Okta API requests per event loop",
+        validation_alias="OKTA_MAX_CONCURRENCY"
+    )
+    
     # Storage Configuration
     storage_backend: Literal["memory", "redis"] = Field(
         default="memory",
@@ -84,6 +92,43 @@ class Settings(BaseSettings):
         description="Redis connection timeout in seconds",
         validation_alias="REDIS_CONNECTION_TIMEOUT"
     )
+    redis_max_connections: int = Field(
+        default=50,
+        ge=1,
+        description="Redis connection pool size",
+        validation_alias="REDIS_MAX_CONNECTIONS"
+    )
+    redis_trust_stored: bool = Field(
+        default=False,
+        description="Skip re-validating users read back from Redis when they match the current schema",
+        validation_alias="REDIS_TRUST_STORED"
+    )
+    redis_compress_values: bool = Field(
+        default=False,
+        description="zstd-compress user values stored in Redis",
+        validation_alias="REDIS_COMPRESS_VALUES"
+    )
+    redis_cluster: bool = Field(
+        default=False,
+        description="Connect to a Redis Cluster (REDIS_HOST:REDIS_PORT is the startup node)",
+        validation_alias="REDIS_CLUSTER"
+    )
+    redis_local_cache_size: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Max users cached in-process in front of Redis (0 disables). "
+            "Writes from other processes, such as the enrichment worker, "
+            "are only seen once REDIS_LOCAL_CACHE_TTL expires"
+        ),
+        validation_alias="REDIS_LOCAL_CACHE_SIZE"
+    )
+    redis_local_cache_ttl: float = Field(
+        default=60,
+        gt=0,
+        description="Seconds a locally cached user is served before re-reading Redis",
+        validation_alias="REDIS_LOCAL_CACHE_TTL"
+    )
     
     @field_validator("okta_org_url")
     @classmethod
@@ -119,16 +164,15 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-# Global settings instance
-_settings: Optional[Settings] = None
-
-
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Get or create the global settings instance."""
-    global _settings
-    if _settings is None:
-        _settings = Settings()
-    return _settings
+    """
+    Get or create the global settings instance.
+    
+    The instance is cached for the process lifetime; call
+    ``get_settings.cache_clear()`` to force a reload.
+    """
+    return Settings()
 
 
 def init_settings() -> Settings:
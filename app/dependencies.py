@@ -38,7 +38,13 @@ def init_user_store() -> UserStore:
                 db=settings.redis_db,
                 password=settings.redis_password,
                 key_prefix=settings.redis_key_prefix,
-                connection_timeout=settings.redis_connection_timeout
+                connection_timeout=settings.redis_connection_timeout,
+                max_connections=settings.redis_max_connections,
+                local_cache_size=settings.redis_local_cache_size,
+                local_cache_ttl=settings.redis_local_cache_ttl,
+                trust_stored=settings.redis_trust_stored,
+                compress=settings.redis_compress_values,
+                cluster=settings.redis_cluster
             )
         else:
             logger.info("Initializing in-memory user store")
@@ -30,6 +30,13 @@ class OktaConfigurationError(OktaAPIError):
         super().__init__(message, status_code=500)
 
 
+class OktaCircuitOpenError(OktaAPIError):
+    """Raised without calling Okta while the Okta circuit breaker is open."""
+    
+    def __init__(self, message: str = "Okta circuit breaker is open"):
+        super().__init__(message, status_code=503)
+
+
 class UserNotFoundError(UserOnboardingError):
     """Raised when user is not found in store."""
     
@@ -38,8 +38,39 @@ class KafkaSettings(BaseSettings):
         description="Acknowledgment level (all, 1, 0)"
     )
     KAFKA_COMPRESSION_TYPE: str = Field(
-        default="gzip",
-        description="Compression type (gzip, snappy, lz4, none)"
+        default="zstd",
+        description="Compression type (zstd, gzip, snappy, lz4, none)"
+    )
+    KAFKA_LINGER_MS: int = Field(
+        default=50,
+        description="Time to wait for more messages before sending a batch (ms)"
+    )
+    KAFKA_BATCH_SIZE: int = Field(
+        default=65536,
+        description="Maximum size of a message batch in bytes"
+    )
+    KAFKA_QUEUE_BUFFERING_MAX_MESSAGES: int = Field(
+        default=200000,
+        description="Maximum number of messages buffered in the producer queue"
+    )
+    KAFKA_WORKER_CONCURRENCY: int = Field(
+        default=10,
+        ge=1,
+        description="Messages the enrichment worker fetches and enriches concurrently"
+    )
+    TRUST_PRODUCER_SCHEMA: bool = Field(
+        default=False,
+        description="Skip re-validating enrichment messages already validated by the API producer"
+    )
+    KAFKA_COMMIT_BATCH_SIZE: int = Field(
+        default=100,
+        ge=1,
+        description="Processed messages the enrichment worker buffers before committing offsets"
+    )
+    KAFKA_COMMIT_INTERVAL_SECONDS: float = Field(
+        default=1.0,
+        gt=0,
+        description="Maximum time the enrichment worker holds processed offsets before committing"
     )
     
     class Config:
@@ -63,8 +94,9 @@ def create_kafka_producer(settings: KafkaSettings) -> Producer:
             'max.in.flight.requests.per.connection': 5,
             'retries': 3,
             'compression.type': settings.KAFKA_COMPRESSION_TYPE,
-            'batch.size': 16384,
-            'linger.ms': 10,
+            'batch.size': settings.KAFKA_BATCH_SIZE,
+            'linger.ms': settings.KAFKA_LINGER_MS,
+            'queue.buffering.max.messages': settings.KAFKA_QUEUE_BUFFERING_MAX_MESSAGES,
         }
         
         producer = Producer(producer_config)
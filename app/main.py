@@ -3,6 +3,7 @@ from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,7 +14,8 @@ from .config import init_settings, get_settings
 from .logging_config import setup_logging
 from .middleware import APIKeyMiddleware
 from .exceptions import UserOnboardingError
-from .dependencies import init_user_store
+from .dependencies import init_user_store, close_kafka_producer
+from .services.okta_loader import close_okta_clients
 
 # Load .env from project root
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,6 +65,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down User Onboarding Integration API...")
+    # Deliver enrichment requests the webhook already acknowledged; the flush
+    # blocks, so it runs off the event loop
+    await asyncio.to_thread(close_kafka_producer)
+    await close_okta_clients()
 
 
 def create_app() -> FastAPI:
@@ -1,10 +1,12 @@
 
 
-from fastapi import Request, HTTPException, status
+from fastapi import status
 from fastapi.security import APIKeyHeader
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Iterable, Optional
+import hmac
 import logging
+import orjson
 
 from .config import get_settings
 from .exceptions import AuthenticationError
@@ -14,53 +16,122 @@ logger = logging.getLogger(__name__)
 # API Key header scheme
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Pre-serialized rejection bodies and response headers (sent directly over ASGI)
+_MISSING_KEY_BODY = orjson.dumps({"detail": "API key required"})
+_INVALID_KEY_BODY = orjson.dumps({"detail": "Invalid API key"})
+_MISSING_KEY_HEADERS = (
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_MISSING_KEY_BODY)).encode()),
+    (b"www-authenticate", b"ApiKey"),
+)
+_INVALID_KEY_HEADERS = (
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_INVALID_KEY_BODY)).encode()),
+)
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
+# Paths protected when the middleware is added without explicit paths
+DEFAULT_PROTECTED_PATHS = ("/v1/hr/webhook",)
+
+
+class APIKeyMiddleware:
     """
     Middleware to validate API key for protected endpoints.
     Only validates requests to /v1/hr/webhook if API_KEY is configured.
+    
+    OPTIONS requests (CORS preflights) are passed through unauthenticated.
+    
+    Protected paths match exactly, except entries ending in "/*" which
+    protect every path under that prefix (e.g. "/v1/admin/*").
+    
+    Implemented as a pure ASGI middleware: the path and X-API-Key header are
+    read straight from the scope, and rejections are sent without building
+    Request/Response objects.
     """
     
-    def __init__(self, app, protected_paths: Optional[list] = None):
-        super().__init__(app)
-        self.protected_paths = protected_paths or ["/v1/hr/webhook"]
-        self.settings = get_settings()
+    def __init__(self, app: ASGIApp, protected_paths: Iterable[str] = DEFAULT_PROTECTED_PATHS):
+        self.app = app
+        paths = tuple(protected_paths)
+        # Exact paths are hashed for O(1) lookup; prefixes are checked
+        # longest first in a single startswith() call
+        self._protected = frozenset(p.encode() for p in paths if not p.endswith("/*"))
+        self._protected_prefixes = tuple(sorted(
+            (p[:-1].encode() for p in paths if p.endswith("/*")),
+            key=len,
+            reverse=True
+        ))
+        # Settings are resolved once here rather than per request; the
+        # expected key is pre-encoded for constant-time comparison
+        api_key = get_settings().api_key
+        self._expected_bytes = api_key.encode() if api_key else None
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Validate API key for protected endpoints."""
+        # Lifespan/websocket scopes and CORS preflights never carry the key
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
         # Skip validation if no API key is configured (development mode)
-        if not self.settings.api_key:
+        if self._expected_bytes is None:
             logger.debug("API key validation disabled (no API_KEY configured)")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Check if path needs protection
-        if request.url.path in self.protected_paths:
-            api_key = request.headers.get("X-API-Key")
+        # Match on the decoded path that routing uses, so percent-encoded
+        # variants of a protected path cannot bypass the check
+        path = scope["path"]
+        path_bytes = path.encode()
+        if path_bytes in self._protected or path_bytes.startswith(self._protected_prefixes):
+            # ASGI header names are already lowercased; compare the raw
+            # value bytes without decoding
+            provided = next((v for k, v in scope["headers"] if k == b"x-api-key"), None)
             
-            if not api_key:
+            if not provided:
                 logger.warning(
                     "API key missing for protected endpoint",
-                    extra={"path": request.url.path, "client": request.client.host if request.client else "unknown"}
+                    extra={"path": path, "client": self._client_host(scope)}
                 )
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="API key required",
-                    headers={"WWW-Authenticate": "ApiKey"},
+                await self._reject(
+                    send,
+                    status.HTTP_401_UNAUTHORIZED,
+                    _MISSING_KEY_BODY,
+                    _MISSING_KEY_HEADERS
                 )
+                return
             
-            if api_key != self.settings.api_key:
+            if not hmac.compare_digest(provided, self._expected_bytes):
                 logger.warning(
                     "Invalid API key for protected endpoint",
-                    extra={"path": request.url.path, "client": request.client.host if request.client else "unknown"}
+                    extra={"path": path, "client": self._client_host(scope)}
                 )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Invalid API key",
+                await self._reject(
+                    send,
+                    status.HTTP_403_FORBIDDEN,
+                    _INVALID_KEY_BODY,
+                    _INVALID_KEY_HEADERS
                 )
+                return
             
-            logger.debug("API key validated successfully", extra={"path": request.url.path})
+            logger.debug("API key validated successfully", extra={"path": path})
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
+    
+    @staticmethod
+    def _client_host(scope: Scope) -> str:
+        """Return the client host from the ASGI scope for logging."""
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+    
+    @staticmethod
+    async def _reject(send: Send, status_code: int, body: bytes, headers: tuple) -> None:
+        """Send a pre-serialized JSON error response directly over ASGI."""
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
 
 
 async def verify_api_key(api_key: Optional[str] = None) -> str:
@@ -77,7 +148,7 @@ async def verify_api_key(api_key: Optional[str] = None) -> str:
     if not api_key:
         raise AuthenticationError("API key required")
     
-    if api_key != settings.api_key:
+    if not hmac.compare_digest(api_key.encode(), settings.api_key.encode()):
         raise AuthenticationError("Invalid API key")
     
     return api_key
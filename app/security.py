@@ -5,7 +5,8 @@ Security utilities for PII protection and webhook signature verification.
 import hmac
 import hashlib
 import re
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Callable, Tuple, List, Iterable
 
 
 def mask_email(email: str) -> str:
@@ -21,17 +22,16 @@ def mask_email(email: str) -> str:
     Returns:
         Masked email address
     """
-    if not email or '@' not in email:
+    if not email:
         return "***"
     
-    local, domain = email.split('@', 1)
-    
-    if len(local) <= 2:
-        masked_local = "*" * len(local)
-    else:
-        masked_local = local[:2] + "***"
+    local, sep, domain = email.partition('@')
+    if not sep:
+        return "***"
     
-    return f"{masked_local}@{domain}"
+    if len(local) > 2:
+        return f"{local[:2]}***@{domain}"
+    return f"{'*' * len(local)}@{domain}"
 
 
 def hash_identifier(identifier: str) -> str:
@@ -50,8 +50,51 @@ def hash_identifier(identifier: str) -> str:
     if not identifier:
         return "***"
     
-    hash_obj = hashlib.sha256(identifier.encode())
-    return hash_obj.hexdigest()[:8]
+    # Log correlation only, not a security boundary; hashlib.sha256 is the
+    # OpenSSL implementation, which uses SHA-NI where the CPU supports it.
+    # Only the 4 bytes kept are hex-encoded
+    hash_obj = hashlib.sha256(identifier.encode(), usedforsecurity=False)
+    return hash_obj.digest()[:4].hex()
+
+
+_NON_DIGITS = re.compile(r'\D')
+
+# Name fields masked to their first letter
+_NAME_KEYS = frozenset({'first_name', 'last_name', 'preferred_name'})
+
+
+def _mask_name(value: str) -> str:
+    """Mask a name to its first letter."""
+    return value[0] + "***" if value else "***"
+
+
+def _mask_phone(value: str) -> str:
+    """Mask a phone number to its last 4 digits."""
+    digits = _NON_DIGITS.sub('', value)
+    if len(digits) >= 4:
+        return f"***{digits[-4:]}"
+    return "***"
+
+
+@lru_cache(maxsize=512)
+def _field_scrubber(key: str) -> Optional[Tuple[str, Callable[[str], str]]]:
+    """
+    Resolve how a log field is scrubbed, once per distinct key.
+    
+    Returns:
+        (output key, scrub function) for PII fields, None for fields kept as-is
+    """
+    lowered = key.lower()
+    if 'email' in lowered:
+        return key, mask_email
+    if key == 'employee_id':
+        # Replaced by its hash; the original employee_id is not included
+        return 'employee_id_hash', hash_identifier
+    if key in _NAME_KEYS:
+        return key, _mask_name
+    if 'phone' in lowered:
+        return key, _mask_phone
+    return None
 
 
 def scrub_pii(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -64,71 +107,94 @@ def scrub_pii(data: Dict[str, Any]) -> Dict[str, Any]:
     - first_name, last_name → First letter only
     - phone numbers → Last 4 digits only
     
+    Only string values are scrubbed; None and other values are kept as-is.
+    
     Args:
         data: Dictionary containing potentially sensitive data
         
     Returns:
         Dictionary with PII masked/hashed
     """
-    scrubbed = {}
+    scrubbed: Dict[str, Any] = {}
     
     for key, value in data.items():
-        if value is None:
-            scrubbed[key] = None
-            continue
-        
-        # Mask emails
-        if 'email' in key.lower() and isinstance(value, str):
-            scrubbed[key] = mask_email(value)
-        
-        # Hash employee IDs
-        elif key == 'employee_id' and isinstance(value, str):
-            scrubbed['employee_id_hash'] = hash_identifier(value)
-            # Don't include original employee_id
-        
-        # Mask names (first letter only)
-        elif key in ('first_name', 'last_name', 'preferred_name') and isinstance(value, str):
-            scrubbed[key] = value[0] + "***" if value else "***"
-        
-        # Mask phone numbers (last 4 digits only)
-        elif 'phone' in key.lower() and isinstance(value, str):
-            # Extract just digits
-            digits = re.sub(r'\D', '', value)
-            if len(digits) >= 4:
-                scrubbed[key] = f"***{digits[-4:]}"
-            else:
-                scrubbed[key] = "***"
-        
-        # Keep other fields as-is
-        else:
+        rule = _field_scrubber(key) if isinstance(value, str) else None
+        if rule is None:
             scrubbed[key] = value
+        else:
+            out_key, scrub = rule
+            scrubbed[out_key] = scrub(value)
     
     return scrubbed
 
 
-def generate_webhook_signature(payload: bytes, secret: str) -> str:
+def scrub_pii_batch(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Scrub a batch of log records with scrub_pii.
+    
+    Args:
+        records: Dictionaries containing potentially sensitive data
+        
+    Returns:
+        List of dictionaries with PII masked/hashed, in input order
+    """
+    return [scrub_pii(data) for data in records]
+
+
+# Webhook signature algorithms: HMAC-SHA256 (the default) and keyed BLAKE2b,
+# a single-pass MAC for senders that support it. Both give 64 hex chars
+SIGNATURE_ALGORITHMS = ("sha256", "blake2b")
+_SIGNATURE_HEX_LENGTH = 64
+
+
+@lru_cache(maxsize=8)
+def _mac_template(secret: str, algorithm: str):
+    """
+    Keyed MAC with no data yet, built once per secret and algorithm.
+    
+    Copying it skips re-deriving the key state (HMAC's inner/outer padded
+    keys, BLAKE2b's key block) on every call.
+    """
+    key = secret.encode()
+    if algorithm == "sha256":
+        return hmac.new(key, digestmod=hashlib.sha256)
+    if algorithm == "blake2b":
+        # BLAKE2b keys are capped at 64 bytes; longer secrets are hashed down,
+        # as HMAC does for keys longer than its block size
+        if len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+            key = hashlib.blake2b(key).digest()
+        return hashlib.blake2b(key=key, digest_size=_SIGNATURE_HEX_LENGTH // 2)
+    raise ValueError(f"Unsupported signature algorithm: {algorithm}")
+
+
+def generate_webhook_signature(payload: bytes, secret: str, algorithm: str = "sha256") -> str:
     """
-    Generate HMAC-SHA256 signature for webhook payload.
+    Generate HMAC-SHA256 (or keyed BLAKE2b) signature for webhook payload.
     
     Args:
         payload: Raw request body as bytes
         secret: Shared secret key
+        algorithm: One of SIGNATURE_ALGORITHMS
         
     Returns:
-        Hex-encoded HMAC signature
+        Hex-encoded signature
+        
+    Raises:
+        ValueError: If the algorithm is not supported
     """
-    signature = hmac.new(
-        secret.encode(),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return signature
+    signature = _mac_template(secret, algorithm).copy()
+    signature.update(payload)
+    return signature.hexdigest()
 
 
-def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> bool:
+def verify_webhook_signature(
+    payload: bytes,
+    signature: str,
+    secret: str,
+    algorithm: str = "sha256"
+) -> bool:
     """
-    Verify webhook signature using HMAC-SHA256.
+    Verify webhook signature using HMAC-SHA256 (or keyed BLAKE2b).
     
     Uses constant-time comparison to prevent timing attacks.
     
@@ -136,15 +202,17 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> boo
         payload: Raw request body as bytes
         signature: Signature from X-Webhook-Signature header
         secret: Shared secret key
+        algorithm: One of SIGNATURE_ALGORITHMS
         
     Returns:
         True if signature is valid, False otherwise
     """
-    if not signature:
+    # A signature of the wrong length can never match, so reject it before
+    # hashing the payload. Length is not secret, so this leaks nothing
+    if not signature or len(signature) != _SIGNATURE_HEX_LENGTH:
         return False
     
-    expected_signature = generate_webhook_signature(payload, secret)
+    expected_signature = generate_webhook_signature(payload, secret, algorithm)
     
     # Use constant-time comparison to prevent timing attacks
     return hmac.compare_digest(signature, expected_signature)
-
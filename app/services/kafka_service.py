@@ -1,7 +1,10 @@
 """Kafka producer/consumer service for user enrichment."""
 
+import asyncio
 import json
 import logging
+import queue
+import threading
 from typing import Optional
 from confluent_kafka import Producer
 from confluent_kafka.error import KafkaError
@@ -12,6 +15,15 @@ from ..security import scrub_pii
 
 logger = logging.getLogger(__name__)
 
+# Attempts to re-enqueue a message while librdkafka's local queue is full
+PRODUCE_BUFFER_RETRIES = 50
+
+# Max delivery reports handled per drain iteration
+DELIVERY_EVENT_BATCH_SIZE = 1000
+
+# Sentinel that stops the delivery event drain thread
+_STOP_DRAIN = object()
+
 
 class UserEnrichmentProducer:
     """Kafka producer for publishing enrichment requests."""
@@ -19,6 +31,10 @@ class UserEnrichmentProducer:
     def __init__(self, producer: Producer, topic: str):
         self.producer = producer
         self.topic = topic
+        # Delivery reports are queued by the callback and logged by a
+        # background thread, keeping librdkafka's callback path cheap
+        self._delivery_events: queue.SimpleQueue = queue.SimpleQueue()
+        self._drain_thread: Optional[threading.Thread] = None
     
     async def publish_enrichment_request(
         self,
@@ -53,16 +69,33 @@ class UserEnrichmentProducer:
             # Use employee_id as key for partitioning
             key = hr_user.employee_id
             
-            # Publish message
-            self.producer.produce(
-                topic=self.topic,
-                key=key,
-                value=json.dumps(message).encode('utf-8'),
-                callback=self._delivery_callback
-            )
+            value = json.dumps(message).encode('utf-8')
             
-            # Flush to ensure message is sent
-            self.producer.flush(timeout=10)
+            self._ensure_drain_thread()
+            
+            # Publish message off the event loop: produce() blocks the calling
+            # thread when the local queue is full
+            for attempt in range(PRODUCE_BUFFER_RETRIES + 1):
+                try:
+                    await asyncio.to_thread(
+                        self.producer.produce,
+                        topic=self.topic,
+                        key=key,
+                        value=value,
+                        callback=self._delivery_callback
+                    )
+                    break
+                except BufferError:
+                    if attempt == PRODUCE_BUFFER_RETRIES:
+                        raise
+                    # Queue full - give librdkafka a moment to drain it
+                    await asyncio.sleep(0.01)
+                    self.producer.poll(0)
+            
+            # Serve delivery reports without blocking; librdkafka sends the
+            # message with its batch (linger.ms / batch.size) and close()
+            # flushes whatever is still queued on shutdown
+            self.producer.poll(0)
             
             logger.info(
                 "Published enrichment request to Kafka",
@@ -100,11 +133,58 @@ class UserEnrichmentProducer:
     
     def _delivery_callback(self, err, msg):
         """Callback for message delivery confirmation."""
-        if err is not None:
-            logger.error(f"Message delivery failed: {err}")
+        if msg is not None:
+            self._delivery_events.put_nowait((err, msg.topic(), msg.partition(), msg.offset()))
         else:
+            self._delivery_events.put_nowait((err, None, None, None))
+    
+    def _ensure_drain_thread(self):
+        """Start the delivery event drain thread if it is not running."""
+        if self._drain_thread is None or not self._drain_thread.is_alive():
+            self._drain_thread = threading.Thread(
+                target=self._drain_delivery_events,
+                name="kafka-delivery-events",
+                daemon=True
+            )
+            self._drain_thread.start()
+    
+    def _drain_delivery_events(self):
+        """Log queued delivery reports in batches until stopped."""
+        while True:
+            event = self._delivery_events.get()
+            if event is _STOP_DRAIN:
+                return
+            
+            batch = [event]
+            stop = False
+            while len(batch) < DELIVERY_EVENT_BATCH_SIZE:
+                try:
+                    event = self._delivery_events.get_nowait()
+                except queue.Empty:
+                    break
+                if event is _STOP_DRAIN:
+                    stop = True
+                    break
+                batch.append(event)
+            
+            self._log_delivery_events(batch)
+            if stop:
+                return
+    
+    def _log_delivery_events(self, batch):
+        """Log a batch of (err, topic, partition, offset) delivery reports."""
+        delivered = 0
+        for err, topic, partition, offset in batch:
+            if err is not None:
+                logger.error(f"Message delivery failed: {err}")
+            else:
+                delivered += 1
+        
+        if delivered and logger.isEnabledFor(logging.DEBUG):
+            last_topic, last_partition, last_offset = batch[-1][1:]
             logger.debug(
-                f"Message delivered to {msg.topic()} [{msg.partition()}] at offset {msg.offset()}"
+                f"{delivered} message(s) delivered, last to {last_topic} "
+                f"[{last_partition}] at offset {last_offset}"
             )
     
     def close(self):
@@ -114,3 +194,8 @@ class UserEnrichmentProducer:
             logger.info("Kafka producer closed")
         except Exception as e:
             logger.error(f"Error closing Kafka producer: {e}")
+        finally:
+            if self._drain_thread is not None:
+                self._delivery_events.put_nowait(_STOP_DRAIN)
+                self._drain_thread.join(timeout=5)
+                self._drain_thread = None
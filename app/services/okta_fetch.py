@@ -0,0 +1,116 @@
+"""
+Okta user fetch with retries and a circuit breaker, shared by the API and the
+enrichment worker.
+"""
+
+import logging
+from tenacity import (
+    RetryError,
+    retry,
+    stop_after_attempt,
+    wait_exponential,
+    retry_if_exception,
+    before_sleep_log,
+    after_log
+)
+
+from .okta_loader import load_okta_user_by_email
+from ..api.circuit_breaker import CircuitBreaker
+from ..exceptions import (
+    OktaAPIError,
+    OktaUserNotFoundError,
+    OktaConfigurationError,
+    OktaCircuitOpenError
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Fail fast once this many enrichments in a row exhaust their Okta retries,
+# instead of spending the full retry backoff on every message while Okta is down
+OKTA_BREAKER_FAILURE_THRESHOLD = 5
+OKTA_BREAKER_RESET_SECONDS = 30
+
+okta_breaker = CircuitBreaker(
+    "okta",
+    failure_threshold=OKTA_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=OKTA_BREAKER_RESET_SECONDS
+)
+
+
+# Transient failures worth retrying, and the OktaAPIError subclasses that
+# are permanent and must not be retried
+RETRYABLE_ERRORS = (OktaAPIError, ConnectionError, TimeoutError)
+NON_RETRYABLE_ERRORS = (OktaUserNotFoundError, OktaConfigurationError)
+
+
+def should_retry_exception(exc: BaseException) -> bool:
+    """Whether a failed Okta fetch should be retried."""
+    if isinstance(exc, NON_RETRYABLE_ERRORS):
+        return False
+    return isinstance(exc, RETRYABLE_ERRORS)
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=30),
+    retry=retry_if_exception(should_retry_exception),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    after=after_log(logger, logging.INFO)
+)
+async def fetch_okta_data_with_retry(email: str):
+    """
+    Fetch Okta user data with automatic retry on transient failures.
+    
+    Retry Strategy:
+    - Attempts: Up to 3 attempts
+    - Wait time: Exponential backoff (2s, 4s, 8s, max 30s)
+    - Retry on: OktaAPIError, ConnectionError, TimeoutError
+    - No retry on: OktaUserNotFoundError, OktaConfigurationError
+    
+    Args:
+        email: User email address to search for
+    
+    Returns:
+        OktaUser object if found
+    
+    Raises:
+        OktaUserNotFoundError: User not found (no retry)
+        OktaConfigurationError: Configuration error (no retry)
+        RetryError: Transient failures outlasted all retries
+    """
+    logger.debug(f"Attempting to fetch Okta data for {email}")
+    return await load_okta_user_by_email(email)
+
+
+async def fetch_okta_data(email: str):
+    """
+    Fetch Okta user data with retries, behind the Okta circuit breaker.
+    
+    Exhausted retries count as a breaker failure; any answer from Okta,
+    including user-not-found, counts as a success.
+    
+    Raises:
+        OktaCircuitOpenError: Breaker is open; Okta was not called
+        RetryError: Transient failures outlasted all retries
+        OktaUserNotFoundError: User not found (no retry)
+        OktaConfigurationError: Configuration error (no retry)
+    """
+    if not okta_breaker.allow_request():
+        raise OktaCircuitOpenError()
+    
+    try:
+        okta_data = await fetch_okta_data_with_retry(email)
+    except RetryError:
+        okta_breaker.record_failure()
+        raise
+    except OktaUserNotFoundError:
+        okta_breaker.record_success()
+        raise
+    except BaseException:
+        # Configuration errors and cancellation say nothing about Okta's health
+        okta_breaker.release()
+        raise
+    
+    okta_breaker.record_success()
+    return okta_data
@@ -1,7 +1,16 @@
 
+import asyncio
 import logging
-from typing import Optional, Dict, List, Any
+import random
+import time
+import weakref
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import quote
+from typing import Optional, Dict, List, Any, Mapping
 import httpx
+import orjson
+from cachetools import TTLCache
 
 from ..schemas import OktaUser, OktaProfile
 from ..config import get_settings
@@ -10,43 +19,221 @@ from ..exceptions import OktaAPIError, OktaUserNotFoundError, OktaConfigurationE
 
 logger = logging.getLogger(__name__)
 
+# Connection pool limits for the shared Okta HTTP client. Keep-alive is sized
+# close to the connection cap so bursts of concurrent lookups reuse warm
+# TLS connections instead of closing them and reconnecting on the next burst
+OKTA_MAX_CONNECTIONS = 100
+OKTA_MAX_KEEPALIVE_CONNECTIONS = 75
 
-def _auth_headers(token: str) -> Dict[str, str]:
-    """Generate authorization headers for Okta API."""
-    return {
-        "Authorization": f"SSWS {token}",
+# Okta rate limit handling: how often a 429 is retried after waiting for the
+# window reset, and how few remaining requests trigger a proactive pause
+OKTA_RATE_LIMIT_RETRIES = 2
+OKTA_RATE_LIMIT_REMAINING_THRESHOLD = 10
+OKTA_RATE_LIMIT_MAX_WAIT_SECONDS = 60
+OKTA_RATE_LIMIT_JITTER_SECONDS = 0.5
+
+# Okta API paths, resolved against the client's base_url
+_USERS_PATH = "/api/v1/users"
+# Email search with the filter pre-encoded; only the email is quoted per
+# call. limit=1 since an email identifies at most one Okta user, and
+# expand=groups asks Okta to embed the user's groups in the same response
+_USER_SEARCH_PATH_TMPL = (
+    _USERS_PATH + "?limit=1&expand=groups&search=" + quote('profile.email eq "{}"', safe="{}")
+)
+_GROUPS_PATH_TMPL = "/api/v1/users/{}/groups"
+_APP_LINKS_PATH_TMPL = "/api/v1/users/{}/appLinks"
+
+# Okta API token authorization scheme
+_SSWS_PREFIX = "SSWS "
+
+# Short-lived cache of loaded Okta users, keyed by email. Repeat lookups of
+# the same email within the TTL (retries, duplicate events) skip the three
+# Okta round trips
+OKTA_USER_CACHE_SIZE = 1024
+OKTA_USER_CACHE_TTL_SECONDS = 30
+# Emails Okta reported as unknown are remembered longer, so repeated events
+# for a missing user do not keep spending Okta rate limit
+OKTA_MISS_CACHE_SIZE = 4096
+OKTA_MISS_CACHE_TTL_SECONDS = 300
+
+
+# Shared Okta HTTP clients, one per org base URL
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _get_client(base_url: str) -> httpx.AsyncClient:
+    """
+    Return the process-wide Okta HTTP client for an org URL.
+    
+    Reusing one client keeps TCP/TLS connections to Okta alive across calls
+    instead of opening a new connection pool per request. The client carries
+    the org base_url so requests only pass the API path. A client closed by
+    close_okta_clients() is replaced on next use.
+    """
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = _clients[base_url] = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=OKTA_MAX_CONNECTIONS,
+                max_keepalive_connections=OKTA_MAX_KEEPALIVE_CONNECTIONS,
+            )
+        )
+    return client
+
+
+async def close_okta_clients() -> None:
+    """Close the shared Okta HTTP clients (called on shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+# Per-event-loop (limit, semaphore) capping in-flight Okta requests
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _okta_semaphore() -> asyncio.Semaphore:
+    """
+    Return the semaphore limiting concurrent Okta requests on this loop.
+    
+    Okta enforces a per-org concurrent request limit; staying under it
+    avoids 429 responses and the retries they trigger when many users are
+    enriched at once.
+    """
+    limit = get_settings().okta_max_concurrency
+    loop = asyncio.get_running_loop()
+    entry = _semaphores.get(loop)
+    if entry is None or entry[0] != limit:
+        entry = _semaphores[loop] = (limit, asyncio.Semaphore(limit))
+    return entry[1]
+
+
+def _rate_limit_wait(resp: httpx.Response) -> Optional[float]:
+    """Seconds until the Okta rate limit window resets, from X-Rate-Limit-Reset."""
+    reset = resp.headers.get("X-Rate-Limit-Reset")
+    if reset is None:
+        return None
+    try:
+        reset_at = int(reset)
+    except ValueError:
+        return None
+    return min(max(0.0, reset_at - time.time()), OKTA_RATE_LIMIT_MAX_WAIT_SECONDS)
+
+
+def _rate_limit_remaining(resp: httpx.Response) -> Optional[int]:
+    """Requests left in the current Okta rate limit window, from X-Rate-Limit-Remaining."""
+    remaining = resp.headers.get("X-Rate-Limit-Remaining")
+    try:
+        return int(remaining) if remaining is not None else None
+    except ValueError:
+        return None
+
+
+async def _okta_get(client: httpx.AsyncClient, path: str, **kwargs: Any) -> httpx.Response:
+    """
+    Issue a GET to the Okta API within the concurrency limit.
+    
+    Okta reports when the current rate limit window resets. A 429 is retried
+    once that reset time has passed (plus jitter) rather than after a blind
+    backoff that may still land inside the same window, and a response with
+    few requests remaining pauses the caller until the reset.
+    """
+    for attempt in range(OKTA_RATE_LIMIT_RETRIES + 1):
+        async with _okta_semaphore():
+            resp = await client.get(path, **kwargs)
+        
+        wait = _rate_limit_wait(resp)
+        if wait is None:
+            return resp
+        
+        if resp.status_code == 429:
+            if attempt == OKTA_RATE_LIMIT_RETRIES:
+                return resp
+            logger.warning(
+                f"Okta rate limit hit, retrying in {wait:.1f}s",
+                extra={"path": path, "attempt": attempt + 1}
+            )
+            await asyncio.sleep(wait + random.uniform(0, OKTA_RATE_LIMIT_JITTER_SECONDS))
+            continue
+        
+        remaining = _rate_limit_remaining(resp)
+        if remaining is not None and remaining < OKTA_RATE_LIMIT_REMAINING_THRESHOLD:
+            logger.info(
+                f"Okta rate limit nearly exhausted, pausing {wait:.1f}s",
+                extra={"path": path, "remaining": remaining}
+            )
+            await asyncio.sleep(wait)
+        return resp
+    
+    # Not reached: the last attempt returns its 429 for the caller to raise
+    raise OktaAPIError("Okta API error: 429", status_code=429)
+
+
+@lru_cache(maxsize=4)
+def _auth_headers(token: str) -> Mapping[str, str]:
+    """
+    Generate authorization headers for Okta API.
+    
+    Cached per token and returned read-only, since the same mapping is
+    shared by every request made with that token.
+    """
+    return MappingProxyType({
+        "Authorization": _SSWS_PREFIX + token,
         "Accept": "application/json",
         "Content-Type": "application/json",
-    }
+    })
+
+
+def _group_name(group: Any) -> Optional[Any]:
+    """Extract a display name from an Okta group object."""
+    if not isinstance(group, dict):
+        return None
+    # Okta group name may be under 'profile' or top-level 'profile' with 'name'
+    profile = group.get("profile")
+    if isinstance(profile, dict):
+        name = profile.get("name") or profile.get("description")
+        if name:
+            return name
+    return group.get("label") or group.get("type")
+
+
+def _app_label(app: Any) -> Optional[Any]:
+    """Extract a display label from an Okta appLink object."""
+    if not isinstance(app, dict):
+        return None
+    return app.get("label") or app.get("appName")
 
 
 async def _find_okta_user_by_email(
     email: str,
     base_url: str,
     token: str,
-    timeout: int
+    timeout: int,
+    client: Optional[httpx.AsyncClient] = None
 ) -> Optional[Dict[str, Any]]:
 
     headers = _auth_headers(token)
+    client = client or _get_client(base_url)
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{base_url}/api/v1/users",
-                headers=headers,
-                params={"search": f'profile.email eq "{email}"'},
-                timeout=timeout,
-            )
-            resp.raise_for_status()
-            
-            users = resp.json()
-            if isinstance(users, list) and users:
-                logger.info("Found Okta user", extra=scrub_pii({"email": email}))
-                return users[0]
-            
-            logger.warning("No Okta user found", extra=scrub_pii({"email": email}))
-            return None
-            
+        resp = await _okta_get(
+            client,
+            _USER_SEARCH_PATH_TMPL.format(quote(email.replace('"', '\\"'), safe="@")),
+            headers=headers,
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        
+        users = orjson.loads(resp.content)
+        if isinstance(users, list) and users:
+            logger.info("Found Okta user", extra=scrub_pii({"email": email}))
+            return users[0]
+        
+        logger.warning("No Okta user found", extra=scrub_pii({"email": email}))
+        return None
+        
     except httpx.HTTPStatusError as e:
         logger.error(
             f"Okta API returned error status: {e.response.status_code}",
@@ -74,41 +261,45 @@ async def _find_okta_user_by_email(
         raise OktaAPIError(f"Unexpected error: {str(e)}", email=email)
 
 
+def _embedded_groups(user: Dict[str, Any]) -> Optional[List[str]]:
+    """Group names from a user's `_embedded.groups`, or None when not embedded."""
+    embedded = user.get("_embedded")
+    groups = embedded.get("groups") if isinstance(embedded, dict) else None
+    if not isinstance(groups, list):
+        return None
+    return [str(name) for name in map(_group_name, groups) if name]
+
+
 async def _get_user_groups(
     user_id: str,
     base_url: str,
     token: str,
-    timeout: int
+    timeout: int,
+    client: Optional[httpx.AsyncClient] = None
 ) -> List[str]:
 
     headers = _auth_headers(token)
+    client = client or _get_client(base_url)
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{base_url}/api/v1/users/{user_id}/groups",
-                headers=headers,
-                timeout=timeout,
-            )
-            resp.raise_for_status()
-            
-            payload = resp.json()
-            names = []
-            for g in payload if isinstance(payload, list) else []:
-                # Okta group name may be under 'profile' or top-level 'profile' with 'name'
-                name = None
-                if isinstance(g, dict):
-                    profile = g.get("profile")
-                    if isinstance(profile, dict):
-                        name = profile.get("name") or profile.get("description")
-                    if not name:
-                        name = g.get("label") or g.get("type")
-                if name:
-                    names.append(str(name))
-            
-            logger.debug(f"Found {len(names)} groups for user {user_id}")
-            return names
-            
+        resp = await _okta_get(
+            client,
+            _GROUPS_PATH_TMPL.format(user_id),
+            headers=headers,
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        
+        payload = orjson.loads(resp.content)
+        names = [
+            str(name)
+            for name in map(_group_name, payload if isinstance(payload, list) else ())
+            if name
+        ]
+        
+        logger.debug(f"Found {len(names)} groups for user {user_id}")
+        return names
+        
     except httpx.HTTPStatusError as e:
         logger.warning(
             f"Failed to fetch groups for user {user_id}: {e.response.status_code}",
@@ -136,31 +327,32 @@ async def _get_user_applications(
     user_id: str,
     base_url: str,
     token: str,
-    timeout: int
+    timeout: int,
+    client: Optional[httpx.AsyncClient] = None
 ) -> List[str]:
 
     headers = _auth_headers(token)
+    client = client or _get_client(base_url)
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{base_url}/api/v1/users/{user_id}/appLinks",
-                headers=headers,
-                timeout=timeout,
-            )
-            resp.raise_for_status()
-            
-            payload = resp.json()
-            labels = []
-            for app in payload if isinstance(payload, list) else []:
-                if isinstance(app, dict):
-                    label = app.get("label") or app.get("appName")
-                    if label:
-                        labels.append(str(label))
-            
-            logger.debug(f"Found {len(labels)} applications for user {user_id}")
-            return labels
-            
+        resp = await _okta_get(
+            client,
+            _APP_LINKS_PATH_TMPL.format(user_id),
+            headers=headers,
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        
+        payload = orjson.loads(resp.content)
+        labels = [
+            str(label)
+            for label in map(_app_label, payload if isinstance(payload, list) else ())
+            if label
+        ]
+        
+        logger.debug(f"Found {len(labels)} applications for user {user_id}")
+        return labels
+        
     except httpx.HTTPStatusError as e:
         logger.warning(
             f"Failed to fetch applications for user {user_id}: {e.response.status_code}",
@@ -184,10 +376,28 @@ async def _get_user_applications(
         return []
 
 
+# Recently loaded users and in-flight loads, keyed by email
+_user_cache: TTLCache = TTLCache(maxsize=OKTA_USER_CACHE_SIZE, ttl=OKTA_USER_CACHE_TTL_SECONDS)
+_miss_cache: TTLCache = TTLCache(maxsize=OKTA_MISS_CACHE_SIZE, ttl=OKTA_MISS_CACHE_TTL_SECONDS)
+_inflight_loads: Dict[str, "asyncio.Task[OktaUser]"] = {}
+
+
+def clear_okta_user_cache() -> None:
+    """Drop cached Okta users (used by tests and after config changes)."""
+    _user_cache.clear()
+    _miss_cache.clear()
+    _inflight_loads.clear()
+
+
 async def load_okta_user_by_email(email: str) -> Optional[OktaUser]:
     """
     Fetch Okta user and enrichments from Okta API using email address.
     
+    Successful loads are cached for OKTA_USER_CACHE_TTL_SECONDS, and
+    concurrent calls for the same email share a single in-flight fetch.
+    Emails not found in Okta are remembered for OKTA_MISS_CACHE_TTL_SECONDS;
+    other failures are not cached so callers can retry.
+    
     Args:
         email: User email address to search for
         
@@ -199,6 +409,37 @@ async def load_okta_user_by_email(email: str) -> Optional[OktaUser]:
         OktaUserNotFoundError: If user is not found in Okta
         OktaAPIError: If Okta API calls fail
     """
+    cached = _user_cache.get(email)
+    if cached is not None:
+        return cached
+    if email in _miss_cache:
+        raise OktaUserNotFoundError(email)
+    
+    loop = asyncio.get_running_loop()
+    task = _inflight_loads.get(email)
+    if task is None or task.get_loop() is not loop:
+        task = loop.create_task(_load_okta_user(email))
+        _inflight_loads[email] = task
+        task.add_done_callback(lambda t: _finish_load(email, t))
+    # Shielded so one cancelled caller does not cancel the shared fetch
+    return await asyncio.shield(task)
+
+
+def _finish_load(email: str, task: "asyncio.Task[OktaUser]") -> None:
+    """Retire a finished in-flight load, caching its result or a not-found miss."""
+    if _inflight_loads.get(email) is task:
+        del _inflight_loads[email]
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is None:
+        _user_cache[email] = task.result()
+    elif isinstance(error, OktaUserNotFoundError):
+        _miss_cache[email] = True
+
+
+async def _load_okta_user(email: str) -> OktaUser:
+    """Load an Okta user with groups and applications (uncached)."""
     try:
         settings = get_settings()
         base_url = settings.okta_org_url
@@ -225,9 +466,17 @@ async def load_okta_user_by_email(email: str) -> Optional[OktaUser]:
         )
         raise OktaAPIError(f"Invalid Okta user data structure", email=email)
     
-    # Fetch groups and applications in parallel
-    groups, applications = await _get_user_groups(user_id, base_url, token, timeout), \
-                           await _get_user_applications(user_id, base_url, token, timeout)
+    # Use groups embedded by expand=groups when Okta returned them; otherwise
+    # fetch groups and applications in parallel
+    embedded_groups = _embedded_groups(user)
+    if embedded_groups is None:
+        groups, applications = await asyncio.gather(
+            _get_user_groups(user_id, base_url, token, timeout),
+            _get_user_applications(user_id, base_url, token, timeout),
+        )
+    else:
+        groups = embedded_groups
+        applications = await _get_user_applications(user_id, base_url, token, timeout)
     
     # Build OktaUser model
     modeled = {
@@ -1,12 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
-import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union, cast
 import logging
+import threading
+
+import orjson
+from cachetools import TTLCache
 
 from .schemas import EnrichedUser
 
+if TYPE_CHECKING:
+    from redis import Redis
+    from redis.cluster import RedisCluster
+
 logger = logging.getLogger(__name__)
 
+# Seconds a pooled Redis connection may sit idle before it is re-checked
+REDIS_HEALTH_CHECK_INTERVAL = 30
+
+# Field set of the current EnrichedUser schema; stored records with exactly
+# these keys can skip validation when the store trusts its own writes
+_ENRICHED_USER_FIELDS = frozenset(EnrichedUser.model_fields)
+# The same fields in schema order, one column each in InMemoryUserStore
+_ENRICHED_USER_COLUMNS = tuple(EnrichedUser.model_fields)
+
+# Leading bytes of every zstd frame; stored JSON always starts with "{"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_COMPRESSION_LEVEL = 3
+
 
 class UserStore(ABC):
     """Abstract base class for user storage backends."""
@@ -20,20 +40,89 @@ class UserStore(ABC):
     def get(self, user_id: str) -> Optional[EnrichedUser]:
         """Retrieve a user by ID."""
         pass
+    
+    def put_many(self, users: Mapping[str, EnrichedUser]) -> None:
+        """Store several users keyed by ID."""
+        for user_id, user in users.items():
+            self.put(user_id, user)
+    
+    def get_many(self, user_ids: Iterable[str]) -> List[Optional[EnrichedUser]]:
+        """Retrieve several users by ID, in order; missing users are None."""
+        return [self.get(user_id) for user_id in user_ids]
 
 
 class InMemoryUserStore(UserStore):
-    """In-memory user storage implementation."""
+    """
+    In-memory user storage implementation.
+    
+    Users are kept column-wise: one list per EnrichedUser field, with rows
+    found through an ID -> row index map, rather than one model instance per
+    user. Rows are rebuilt into models on read without re-validation, since
+    they were validated models when stored.
+    
+    Readers take no lock. A stored row is never modified: overwriting a user
+    appends a new row and repoints its index entry, so a reader sees either
+    the old or the new row, never a mix. Once dead rows outnumber live ones
+    the columns are compacted into a new (index, columns) snapshot that
+    replaces the old one in a single assignment. Writers are serialized.
+    """
     
     def __init__(self) -> None:
-        self._users: Dict[str, EnrichedUser] = {}
+        self._write_lock = threading.Lock()
+        self._state: Tuple[Dict[str, int], Dict[str, list]] = (
+            {},
+            {name: [] for name in _ENRICHED_USER_COLUMNS}
+        )
+        self._dead_rows = 0
         logger.info("Initialized InMemoryUserStore")
 
     def put(self, user_id: str, user: EnrichedUser) -> None:
-        self._users[user_id] = user
+        with self._write_lock:
+            index, columns = self._state
+            # Fill the row before publishing its index, so a concurrent
+            # reader never finds an index without data behind it
+            for name, column in columns.items():
+                column.append(getattr(user, name))
+            if user_id in index:
+                self._dead_rows += 1
+            index[user_id] = len(columns["id"]) - 1
+            
+            if self._dead_rows > len(index):
+                self._compact()
+
+    def _compact(self) -> None:
+        """Drop overwritten rows by publishing a new snapshot (write lock held)."""
+        index, columns = self._state
+        rows = list(index.values())
+        self._state = (
+            dict(zip(index, range(len(rows)))),
+            {name: [column[row] for row in rows] for name, column in columns.items()}
+        )
+        self._dead_rows = 0
 
     def get(self, user_id: str) -> Optional[EnrichedUser]:
-        return self._users.get(user_id)
+        index, columns = self._state
+        row = index.get(user_id)
+        if row is None:
+            return None
+        return EnrichedUser.model_construct(
+            **{name: column[row] for name, column in columns.items()}
+        )
+
+    def get_field(self, user_id: str, field: str) -> Any:
+        """
+        Read one field of a stored user without building the model.
+        
+        Returns:
+            The field value, or None if the user is not stored
+            
+        Raises:
+            KeyError: If field is not an EnrichedUser field
+        """
+        index, columns = self._state
+        column = columns[field]
+        row = index.get(user_id)
+        return None if row is None else column[row]
 
 
 class RedisUserStore(UserStore):
@@ -46,7 +135,13 @@ class RedisUserStore(UserStore):
         db: int = 0,
         password: Optional[str] = None,
         key_prefix: str = "user_onboarding:",
-        connection_timeout: int = 5
+        connection_timeout: int = 5,
+        max_connections: int = 50,
+        local_cache_size: int = 0,
+        local_cache_ttl: float = 60,
+        trust_stored: bool = False,
+        compress: bool = False,
+        cluster: bool = False
     ) -> None:
         """
         Initialize Redis user store.
@@ -57,7 +152,21 @@ class RedisUserStore(UserStore):
             db: Redis database number
             password: Redis password (optional)
             key_prefix: Prefix for all keys stored in Redis
-            connection_timeout: Connection timeout in seconds
+            connection_timeout: Connection timeout in seconds (also the time
+                to wait for a free pooled connection)
+            max_connections: Size of the shared connection pool
+            local_cache_size: Max users kept in the in-process read cache
+                (0 disables it). Writes from other processes, such as the
+                enrichment worker, are only seen once the TTL expires
+            local_cache_ttl: Seconds a cached user is served before
+                re-reading from Redis
+            trust_stored: Build users read back from Redis without
+                re-validating them, for records matching the current schema
+            compress: zstd-compress values before writing them. Reads
+                accept both compressed and plain JSON values either way
+            cluster: Connect to a Redis Cluster through host:port as the
+                startup node. User IDs in keys are wrapped in a {hash tag}
+                so all keys for one user land in the same slot
         """
         try:
             import redis
@@ -68,15 +177,61 @@ class RedisUserStore(UserStore):
             )
         
         self.key_prefix = key_prefix
-        self.client = redis.Redis(
-            host=host,
-            port=port,
-            db=db,
-            password=password,
-            decode_responses=True,  # Automatically decode responses to strings
-            socket_connect_timeout=connection_timeout,
-            socket_timeout=connection_timeout
+        self._cluster = cluster
+        self._trust_stored = trust_stored
+        self._compress = compress
+        # zstd contexts are not safe for concurrent use, so each thread
+        # (sync endpoints run on a pool) gets its own
+        self._zstd = threading.local()
+        if compress:
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                raise RuntimeError(
+                    "zstandard package is required for compressed RedisUserStore values. "
+                    "Install it with: pip install zstandard"
+                )
+        self._key_prefix_bytes = key_prefix.encode()
+        # Read-through cache of recently seen users; writes from this process
+        # invalidate it, writes from other processes are picked up after the TTL
+        self._cache: Optional[TTLCache] = (
+            TTLCache(maxsize=local_cache_size, ttl=local_cache_ttl) if local_cache_size > 0 else None
         )
+        self._cache_lock = threading.Lock()
+        self.client: Union["Redis", "RedisCluster"]
+        if cluster:
+            import redis.cluster
+            # Cluster clients keep one pool per node; the per-node limit is
+            # max_connections and db selection is not supported
+            self._pool = None
+            self.client = redis.cluster.RedisCluster(
+                startup_nodes=[redis.cluster.ClusterNode(host, port)],
+                password=password,
+                decode_responses=False,
+                socket_connect_timeout=connection_timeout,
+                socket_timeout=connection_timeout,
+                max_connections=max_connections,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL
+            )
+        else:
+            # A blocking pool makes callers wait briefly for a free connection
+            # when it is exhausted instead of failing, and health checks catch
+            # connections dropped while idle before a command is sent on them
+            self._pool = redis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                # Values are handed to pydantic as raw JSON bytes, so skip
+                # redis-py's per-reply UTF-8 decode
+                decode_responses=False,
+                socket_connect_timeout=connection_timeout,
+                socket_timeout=connection_timeout,
+                max_connections=max_connections,
+                timeout=connection_timeout,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL
+            )
+            self.client = redis.Redis(connection_pool=self._pool)
         
         # Test connection
         try:
@@ -101,9 +256,11 @@ class RedisUserStore(UserStore):
             )
             raise
     
-    def _make_key(self, user_id: str) -> str:
-        """Generate Redis key for a user ID."""
-        return f"{self.key_prefix}{user_id}"
+    def _make_key(self, user_id: str) -> bytes:
+        """Generate Redis key for a user ID, pre-encoded for the wire."""
+        if self._cluster:
+            return self._key_prefix_bytes + b"{" + user_id.encode() + b"}"
+        return self._key_prefix_bytes + user_id.encode()
     
     def put(self, user_id: str, user: EnrichedUser) -> None:
         """
@@ -115,7 +272,10 @@ class RedisUserStore(UserStore):
             key = self._make_key(user_id)
             # Serialize EnrichedUser to JSON
             user_json = user.model_dump_json()
-            self.client.set(key, user_json)
+            self.client.set(key, self._encode_value(user_json))
+            # Invalidate only after the write lands, so a concurrent get cannot
+            # re-cache the old value between the two
+            self._invalidate(user_id)
             logger.debug(f"Stored user in Redis: {user_id}", extra={"user_id": user_id})
         except Exception as e:
             logger.error(
@@ -131,16 +291,21 @@ class RedisUserStore(UserStore):
         
         Returns None if the user is not found.
         """
+        cached = self._cache_get(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             key = self._make_key(user_id)
-            user_json = self.client.get(key)
+            # Sync client with decode_responses=False: raw bytes or None
+            user_json = cast(Optional[bytes], self.client.get(key))
             
             if user_json is None:
                 logger.debug(f"User not found in Redis: {user_id}", extra={"user_id": user_id})
                 return None
             
-            # Deserialize JSON to EnrichedUser
-            user = EnrichedUser.model_validate_json(user_json)
+            user = self._load_user(user_json)
+            self._cache_put(user_id, user)
             logger.debug(f"Retrieved user from Redis: {user_id}", extra={"user_id": user_id})
             return user
         except Exception as e:
@@ -151,10 +316,127 @@ class RedisUserStore(UserStore):
             )
             raise
     
+    def put_many(self, users: Mapping[str, EnrichedUser]) -> None:
+        """
+        Store several users in Redis.
+        
+        All SETs are sent in one non-transactional pipeline, so the batch
+        costs a single round-trip instead of one per user.
+        """
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                for user_id, user in users.items():
+                    pipe.set(self._make_key(user_id), self._encode_value(user.model_dump_json()))
+                pipe.execute()
+            for user_id in users:
+                self._invalidate(user_id)
+            logger.debug(f"Stored {len(users)} users in Redis", extra={"count": len(users)})
+        except Exception as e:
+            logger.error(
+                f"Failed to store users in Redis: {str(e)}",
+                extra={"count": len(users), "error": str(e)},
+                exc_info=True
+            )
+            raise
+    
+    def get_many(self, user_ids: Iterable[str]) -> List[Optional[EnrichedUser]]:
+        """
+        Retrieve several users from Redis with a single MGET.
+        
+        Locally cached users are served without touching Redis. Results are
+        returned in the order of user_ids; missing users are None.
+        """
+        user_ids = list(user_ids)
+        results = [self._cache_get(user_id) for user_id in user_ids]
+        missing = [user_id for user_id, user in zip(user_ids, results) if user is None]
+        if not missing:
+            return results
+        try:
+            keys = [self._make_key(user_id) for user_id in missing]
+            if self._cluster:
+                # Different users hash to different slots, so a cluster MGET
+                # has to be split per node
+                values: Any = cast("RedisCluster", self.client).mget_nonatomic(keys)
+            else:
+                values = self.client.mget(keys)
+            fetched = {}
+            # Sync client with decode_responses=False: raw bytes or None per key
+            for user_id, user_json in zip(missing, cast(List[Optional[bytes]], values)):
+                if user_json is not None:
+                    fetched[user_id] = self._load_user(user_json)
+                    self._cache_put(user_id, fetched[user_id])
+            return [user if user is not None else fetched.get(user_id) for user_id, user in zip(user_ids, results)]
+        except Exception as e:
+            logger.error(
+                f"Failed to retrieve users from Redis: {str(e)}",
+                extra={"count": len(missing), "error": str(e)},
+                exc_info=True
+            )
+            raise
+    
+    def _encode_value(self, user_json: str) -> Union[str, bytes]:
+        """Prepare serialized user JSON for storage, compressing it if enabled."""
+        if not self._compress:
+            return user_json
+        compressor = getattr(self._zstd, "compressor", None)
+        if compressor is None:
+            import zstandard
+            compressor = self._zstd.compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL)
+        return compressor.compress(user_json.encode())
+    
+    def _decode_value(self, raw: Union[str, bytes]) -> Union[str, bytes]:
+        """Return stored user JSON, decompressing zstd frames."""
+        if not (isinstance(raw, bytes) and raw.startswith(_ZSTD_MAGIC)):
+            return raw
+        decompressor = getattr(self._zstd, "decompressor", None)
+        if decompressor is None:
+            import zstandard
+            decompressor = self._zstd.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(raw)
+    
+    def _load_user(self, raw: Union[str, bytes]) -> EnrichedUser:
+        """
+        Deserialize a stored user.
+        
+        When the store trusts its own writes, records whose keys match the
+        current schema are built with model_construct, skipping validation
+        (EmailStr checks dominate read cost). Anything else, e.g. records
+        written before a schema change, goes through full validation.
+        """
+        user_json = self._decode_value(raw)
+        if self._trust_stored:
+            data = orjson.loads(user_json)
+            if isinstance(data, dict) and data.keys() == _ENRICHED_USER_FIELDS:
+                return EnrichedUser.model_construct(**data)
+            return EnrichedUser.model_validate(data)
+        return EnrichedUser.model_validate_json(user_json)
+    
+    def _cache_get(self, user_id: str) -> Optional[EnrichedUser]:
+        """Return a locally cached user, or None on a miss."""
+        if self._cache is None:
+            return None
+        with self._cache_lock:
+            return self._cache.get(user_id)
+    
+    def _cache_put(self, user_id: str, user: EnrichedUser) -> None:
+        """Remember a user read from Redis."""
+        if self._cache is not None:
+            with self._cache_lock:
+                self._cache[user_id] = user
+    
+    def _invalidate(self, user_id: str) -> None:
+        """Drop a user from the local cache before it is overwritten."""
+        if self._cache is not None:
+            with self._cache_lock:
+                self._cache.pop(user_id, None)
+    
     def close(self) -> None:
         """Close the Redis connection."""
         try:
             self.client.close()
+            # The client does not own an explicitly passed pool
+            if self._pool is not None:
+                self._pool.disconnect()
             logger.info("Closed Redis connection")
         except Exception as e:
             logger.warning(f"Error closing Redis connection: {str(e)}")
@@ -2,12 +2,22 @@
 Pytest configuration and fixtures for the User Onboarding Integration API tests.
 """
 
+import asyncio
 import os
 import pytest
 import tempfile
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 from typing import Dict, Any
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
+import httpx
+import orjson
+from pytest_asyncio import is_async_test
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Set test environment variables BEFORE importing app modules
 os.environ.setdefault("OKTA_ORG_URL", "https://test-org.okta.com")
@@ -21,12 +31,37 @@ os.environ.setdefault("KAFKA_CONSUMER_GROUP", "test-enrichment-workers")
 
 from app.main import create_app
 from app.store import InMemoryUserStore, RedisUserStore
-from app.config import Settings
+from app.schemas import EnrichedUser, HRUserIn, OktaProfile, OktaUser
+from app.config import Settings, get_settings
+from app.services.okta_loader import clear_okta_user_cache
+from app.services.okta_fetch import okta_breaker
 from app.security import generate_webhook_signature
 import json
 from unittest.mock import MagicMock, patch
 
 
+def pytest_collection_modifyitems(items):
+    """Run every async test in the session-scoped event loop."""
+    session_scope_marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_scope_marker, append=False)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_up_email_validation():
+    """Validate one email up front so email-validator's lazy setup runs once per worker."""
+    HRUserIn(employee_id="0", first_name="a", last_name="b", email="a@example.com")
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Use uvloop for async tests when it is installed."""
+    if uvloop is not None:
+        return uvloop.EventLoopPolicy()
+    return asyncio.DefaultEventLoopPolicy()
+
+
 @pytest.fixture(scope="function")
 def test_settings():
     """Create test settings with mock Okta credentials."""
@@ -137,9 +172,70 @@ def redis_user_store(mock_redis_client):
 
 
 @pytest.fixture
+def cached_redis_user_store(mock_redis_client):
+    """Create a RedisUserStore with the in-process read cache enabled."""
+    with patch('redis.Redis', return_value=mock_redis_client):
+        return RedisUserStore(key_prefix="test:", local_cache_size=100)
+
+
+@pytest.fixture(scope="session")
+def user_jane():
+    """Fully populated EnrichedUser, built once per session (do not mutate; use model_copy)."""
+    return EnrichedUser(
+        id="12345",
+        name="Jane Doe",
+        email="jane.doe@example.com",
+        title="Software Engineer",
+        department="Engineering",
+        startDate="2024-01-15",
+        groups=["Engineering"],
+        applications=["Slack"],
+        onboarded=True
+    )
+
+
+@pytest.fixture(scope="session")
+def user_john():
+    """Second EnrichedUser with a distinct ID, built once per session."""
+    return EnrichedUser(
+        id="67890",
+        name="John Smith",
+        email="john.smith@example.com",
+        title="Product Manager",
+        department="Product"
+    )
+
+
+@pytest.fixture(scope="session")
+def minimal_user():
+    """EnrichedUser with only the required fields, built once per session."""
+    return EnrichedUser(
+        id="12345",
+        name="Minimal User",
+        email="minimal@example.com"
+    )
+
+
+@pytest.fixture(scope="session")
+def complex_user():
+    """EnrichedUser with several groups and applications, built once per session."""
+    return EnrichedUser(
+        id="12345",
+        name="Complex User",
+        email="complex@example.com",
+        title="Full Stack Developer",
+        department="Engineering",
+        startDate="2024-01-15",
+        groups=["Engineering", "Full-Time Employees", "Stockholm Office", "Senior Developers"],
+        applications=["Google Workspace", "Slack", "Jira", "GitHub", "VS Code"],
+        onboarded=True
+    )
+
+
+@pytest.fixture(scope="session")
 def sample_hr_user():
-    """Sample HR user data for testing."""
-    return {
+    """Sample HR user data for testing (read-only; copy it to modify)."""
+    return MappingProxyType({
         "employee_id": "12345",
         "first_name": "Jane",
         "last_name": "Doe",
@@ -162,12 +258,11 @@ def sample_hr_user():
         "time_zone": "Europe/Stockholm",
         "legal_entity": "Epidemic Sound AB",
         "division": "Product & Engineering"
-    }
+    })
 
 
-@pytest.fixture
-def sample_okta_user():
-    """Sample Okta user data for testing."""
+def _sample_okta_user_data() -> Dict[str, Any]:
+    """Fresh copy of the sample Okta user payload."""
     return {
         "profile": {
             "login": "test.user@example.com",
@@ -189,6 +284,69 @@ def sample_okta_user():
     }
 
 
+@pytest.fixture(scope="session")
+def sample_okta_user():
+    """Sample Okta user data for testing (read-only; copy it to modify)."""
+    return MappingProxyType(_sample_okta_user_data())
+
+
+@pytest.fixture(scope="session")
+def sample_okta_user_model():
+    """
+    Sample Okta user as a model, built once without re-validating.
+    
+    For tests that only pass the model through; schema tests should keep
+    validating sample_okta_user themselves.
+    """
+    data = _sample_okta_user_data()
+    return OktaUser.model_construct(
+        profile=OktaProfile.model_construct(**data["profile"]),
+        groups=data["groups"],
+        applications=data["applications"],
+    )
+
+
+@pytest.fixture
+def make_response():
+    """Return a factory for Okta API responses with a pre-encoded JSON body."""
+    def _make(payload=None, status=200):
+        content = b"" if payload is None else orjson.dumps(payload)
+        return httpx.Response(
+            status,
+            content=content,
+            headers={"content-type": "application/json"}
+        )
+    
+    return _make
+
+
+@pytest.fixture
+def make_error_client():
+    """Return a factory for Okta HTTP clients whose get() raises the given exception."""
+    def _make(exc):
+        client = AsyncMock()
+        client.get.side_effect = exc
+        return client
+    
+    return _make
+
+
+@pytest.fixture
+def fake_kafka_message():
+    """Return a factory for plain Kafka message fakes (no Mock call bookkeeping)."""
+    def _make(value=None, key=None, topic=None, partition=None, offset=None, error=None):
+        return SimpleNamespace(
+            value=lambda: value,
+            key=lambda: key,
+            topic=lambda: topic,
+            partition=lambda: partition,
+            offset=lambda: offset,
+            error=lambda: error,
+        )
+    
+    return _make
+
+
 @pytest.fixture
 def mock_okta_credentials():
     """Mock Okta credentials for testing."""
@@ -249,6 +407,30 @@ def temp_env_file(mock_okta_credentials):
         pass
 
 
+@pytest.fixture(autouse=True)
+def clear_settings_cache():
+    """Drop the cached settings so one test's configuration cannot leak into the next."""
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_okta_cache():
+    """Drop cached Okta users so a lookup in one test cannot satisfy the next."""
+    clear_okta_user_cache()
+    yield
+    clear_okta_user_cache()
+
+
+@pytest.fixture(autouse=True)
+def reset_okta_breaker():
+    """Close the Okta circuit breaker so failures in one test cannot trip it for the next."""
+    okta_breaker.reset()
+    yield
+    okta_breaker.reset()
+
+
 @pytest.fixture(autouse=True)
 def cleanup_env():
     """Clean up environment variables after each test."""
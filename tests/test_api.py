@@ -33,7 +33,7 @@ class TestHRWebhookEndpoint:
         mock_producer = get_kafka_producer()
         mock_producer.publish_enrichment_request = AsyncMock(return_value=True)
         
-        response = client.post("/v1/hr/webhook", json=sample_hr_user)
+        response = client.post("/v1/hr/webhook", json=dict(sample_hr_user))
         
         assert response.status_code == 202
         data = response.json()
@@ -58,7 +58,7 @@ class TestHRWebhookEndpoint:
         mock_producer = get_kafka_producer()
         mock_producer.publish_enrichment_request = AsyncMock(return_value=False)
         
-        response = client.post("/v1/hr/webhook", json=sample_hr_user)
+        response = client.post("/v1/hr/webhook", json=dict(sample_hr_user))
         
         # Should return 503 Service Unavailable when Kafka publish fails
         assert response.status_code == 503
@@ -73,10 +73,10 @@ class TestHRWebhookEndpoint:
         mock_producer.publish_enrichment_request = AsyncMock(return_value=True)
         
         # Use a unique employee_id to avoid conflicts with other tests
-        sample_hr_user["employee_id"] = "99999"
+        hr_user = {**sample_hr_user, "employee_id": "99999"}
         
         # Webhook should accept (202) and publish to Kafka
-        response = client.post("/v1/hr/webhook", json=sample_hr_user)
+        response = client.post("/v1/hr/webhook", json=hr_user)
         
         assert response.status_code == 202
         data = response.json()
@@ -115,6 +115,27 @@ class TestHRWebhookEndpoint:
         assert response.status_code == 422  # Validation error
 
 
+class TestLifespan:
+    """Test application startup and shutdown."""
+    
+    def test_shutdown_flushes_kafka_producer(self, app, test_settings):
+        """Test that shutting the app down flushes queued enrichment requests."""
+        from app import dependencies
+        from app.services.kafka_service import UserEnrichmentProducer
+        
+        kafka_producer = MagicMock()
+        dependencies._kafka_producer = UserEnrichmentProducer(producer=kafka_producer, topic="test.topic")
+        
+        with patch("app.main.init_settings", return_value=test_settings), \
+             patch("app.main.init_user_store"), \
+             patch("app.main.close_okta_clients", AsyncMock()):
+            with TestClient(app):
+                kafka_producer.flush.assert_not_called()
+        
+        kafka_producer.flush.assert_called_once()
+        assert dependencies._kafka_producer is None
+
+
 class TestUsersEndpoint:
     """Test users retrieval endpoint."""
     
@@ -182,10 +203,10 @@ class TestIntegration:
         mock_producer.publish_enrichment_request = AsyncMock(return_value=True)
         
         # Modify the sample data to have different emails
-        sample_hr_user["email"] = "hr.user@example.com"
+        hr_user = {**sample_hr_user, "email": "hr.user@example.com"}
         
         # Webhook accepts immediately
-        response = client.post("/v1/hr/webhook", json=sample_hr_user)
+        response = client.post("/v1/hr/webhook", json=hr_user)
         assert response.status_code == 202
         
         webhook_data = response.json()
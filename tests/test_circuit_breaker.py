@@ -0,0 +1,113 @@
+"""
+Tests for the in-process circuit breaker.
+"""
+
+import pytest
+
+from app.api.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Fake clock starting at zero."""
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    """Breaker that opens after 3 failures and resets after 30s."""
+    return CircuitBreaker("okta", failure_threshold=3, reset_timeout=30, clock=clock)
+
+
+class TestCircuitBreaker:
+    """Test circuit breaker state transitions."""
+    
+    def test_starts_closed(self, breaker):
+        """Test that a new breaker allows requests."""
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request() is True
+    
+    def test_opens_after_threshold_failures(self, breaker):
+        """Test that consecutive failures up to the threshold open the breaker."""
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+    
+    def test_success_resets_failure_count(self, breaker):
+        """Test that a success in between failures keeps the breaker closed."""
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_after_reset_timeout(self, breaker, clock):
+        """Test that an open breaker lets requests through again after the timeout."""
+        for _ in range(3):
+            breaker.record_failure()
+        
+        clock.now = 29.9
+        assert breaker.allow_request() is False
+        
+        clock.now = 30
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is True
+    
+    def test_half_open_allows_single_probe(self, breaker, clock):
+        """Test that only one call goes through while half-open until the probe finishes."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 30
+        
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        
+        breaker.release()
+        
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is True
+    
+    @pytest.mark.parametrize("outcome,expected_state", [
+        ("success", CircuitBreaker.CLOSED),
+        ("failure", CircuitBreaker.OPEN),
+    ])
+    def test_half_open_outcome(self, breaker, clock, outcome, expected_state):
+        """Test that the first result while half-open closes or reopens the breaker."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 30
+        
+        if outcome == "success":
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        
+        assert breaker.state == expected_state
+    
+    def test_reset(self, breaker):
+        """Test that reset closes an open breaker."""
+        for _ in range(3):
+            breaker.record_failure()
+        
+        breaker.reset()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
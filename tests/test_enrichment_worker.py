@@ -5,7 +5,8 @@ Tests for the enrichment worker functionality.
 import pytest
 from unittest.mock import patch, Mock, AsyncMock, MagicMock
 import json
-from confluent_kafka import KafkaError
+import time
+from confluent_kafka import KafkaError, TopicPartition
 
 from app.schemas import HRUserIn, OktaUser, OktaProfile, EnrichedUser
 from app.exceptions import OktaUserNotFoundError, OktaConfigurationError, OktaAPIError
@@ -59,7 +60,7 @@ class TestEnrichmentWorker:
         from workers.enrichment_worker import process_enrichment_message
         
         # Mock the Okta loader
-        with patch('workers.enrichment_worker.load_okta_user_by_email', return_value=sample_okta_user):
+        with patch('app.services.okta_fetch.load_okta_user_by_email', return_value=sample_okta_user):
             success, error = await process_enrichment_message(sample_message_data, mock_user_store)
             
             assert success is True
@@ -77,13 +78,84 @@ class TestEnrichmentWorker:
             assert "Engineering" in enriched_user.groups
             assert "Google Workspace" in enriched_user.applications
     
+    @pytest.mark.asyncio
+    async def test_process_enrichment_message_stores_off_event_loop(self, sample_message_data, sample_okta_user,
+                                                                    mock_user_store):
+        """Test that the blocking store write runs in a worker thread."""
+        import threading
+        from workers.enrichment_worker import process_enrichment_message
+        
+        put_threads = []
+        mock_user_store.put.side_effect = lambda user_id, user: put_threads.append(threading.get_ident())
+        
+        with patch('app.services.okta_fetch.load_okta_user_by_email', return_value=sample_okta_user):
+            success, error = await process_enrichment_message(sample_message_data, mock_user_store)
+        
+        assert success is True
+        assert len(put_threads) == 1
+        assert put_threads[0] != threading.get_ident()
+    
+    @pytest.mark.asyncio
+    async def test_process_enrichment_message_skips_scrub_above_info(self, sample_message_data, sample_okta_user,
+                                                                     mock_user_store, caplog):
+        """Test that info log extras are not built when INFO is disabled."""
+        import logging
+        from workers.enrichment_worker import process_enrichment_message
+        
+        caplog.set_level(logging.WARNING, logger="workers.enrichment_worker")
+        
+        with patch('app.services.okta_fetch.load_okta_user_by_email', return_value=sample_okta_user), \
+             patch('workers.enrichment_worker.scrub_pii') as mock_scrub:
+            success, error = await process_enrichment_message(sample_message_data, mock_user_store)
+        
+        assert success is True
+        mock_scrub.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("trust_schema,expected", [(True, True), (False, False)])
+    async def test_process_enrichment_message_trust_schema(self, sample_message_data, sample_okta_user,
+                                                           mock_user_store, trust_schema, expected):
+        """Test that trusted messages skip HR payload validation."""
+        from workers.enrichment_worker import process_enrichment_message
+        
+        message = {**sample_message_data, "manager_email": "not-an-email"}
+        
+        with patch('app.services.okta_fetch.load_okta_user_by_email', return_value=sample_okta_user):
+            success, error = await process_enrichment_message(message, mock_user_store, trust_schema)
+        
+        assert success is expected
+        assert mock_user_store.put.called is expected
+    
+    @pytest.mark.asyncio
+    async def test_malformed_message_fails_fast_with_default_settings(self, sample_message_data, mock_user_store,
+                                                                     fake_kafka_message):
+        """Test that a malformed message is rejected without an Okta lookup under the default settings."""
+        from app.kafka_config import KafkaSettings
+        from workers.enrichment_worker import decode_and_process
+        
+        settings = KafkaSettings()
+        message = {**sample_message_data, "email": None}
+        msg = fake_kafka_message(value=json.dumps(message).encode())
+        
+        with patch('app.services.okta_fetch.load_okta_user_by_email') as mock_load:
+            message_value, success, error = await decode_and_process(
+                msg, mock_user_store, settings.TRUST_PRODUCER_SCHEMA
+            )
+        
+        assert settings.TRUST_PRODUCER_SCHEMA is False
+        assert message_value == message
+        assert success is False
+        assert "validation error" in error
+        mock_load.assert_not_called()
+        mock_user_store.put.assert_not_called()
+    
     @pytest.mark.asyncio
     async def test_process_enrichment_message_okta_user_not_found(self, sample_message_data, mock_user_store):
         """Test message processing when Okta user is not found."""
         from workers.enrichment_worker import process_enrichment_message
         
         # Mock Okta user not found
-        with patch('workers.enrichment_worker.load_okta_user_by_email', 
+        with patch('app.services.okta_fetch.load_okta_user_by_email', 
                   side_effect=OktaUserNotFoundError("test.user@example.com")):
             success, error = await process_enrichment_message(sample_message_data, mock_user_store)
             
@@ -100,7 +172,7 @@ class TestEnrichmentWorker:
         from workers.enrichment_worker import process_enrichment_message
         
         # Mock Okta configuration error
-        with patch('workers.enrichment_worker.load_okta_user_by_email', 
+        with patch('app.services.okta_fetch.load_okta_user_by_email', 
                   side_effect=OktaConfigurationError("Invalid configuration")):
             success, error = await process_enrichment_message(sample_message_data, mock_user_store)
             
@@ -117,7 +189,7 @@ class TestEnrichmentWorker:
         from workers.enrichment_worker import process_enrichment_message
         
         # Mock Okta API error
-        with patch('workers.enrichment_worker.load_okta_user_by_email', 
+        with patch('app.services.okta_fetch.load_okta_user_by_email', 
                   side_effect=OktaAPIError("API error", status_code=500)):
             success, error = await process_enrichment_message(sample_message_data, mock_user_store)
             
@@ -128,13 +200,53 @@ class TestEnrichmentWorker:
             # Verify user was NOT stored
             mock_user_store.put.assert_not_called()
     
+    @pytest.mark.asyncio
+    async def test_process_enrichment_message_okta_api_error_subclass(self, sample_message_data, mock_user_store):
+        """Test that subclasses of a known Okta error use its handler."""
+        from workers.enrichment_worker import process_enrichment_message
+        
+        class OktaRateLimitError(OktaAPIError):
+            pass
+        
+        with patch('workers.enrichment_worker.fetch_okta_data',
+                   side_effect=OktaRateLimitError("rate limited", status_code=429)):
+            success, error = await process_enrichment_message(sample_message_data, mock_user_store)
+        
+        assert success is False
+        assert error == "Okta API error after retries: rate limited"
+    
+    @pytest.mark.asyncio
+    async def test_process_enrichment_message_fails_fast_while_okta_down(self, sample_message_data,
+                                                                       mock_user_store, monkeypatch):
+        """Test that once Okta keeps failing, later messages fail fast without calling Okta."""
+        from tenacity import wait_none
+        from workers.enrichment_worker import process_enrichment_message
+        from app.services.okta_fetch import OKTA_BREAKER_FAILURE_THRESHOLD, fetch_okta_data_with_retry
+        
+        monkeypatch.setattr(fetch_okta_data_with_retry.retry, "wait", wait_none())
+        
+        with patch('app.services.okta_fetch.load_okta_user_by_email',
+                   side_effect=OktaAPIError("Service unavailable", status_code=503)) as mock_load:
+            for _ in range(OKTA_BREAKER_FAILURE_THRESHOLD):
+                success, error = await process_enrichment_message(sample_message_data, mock_user_store)
+                assert success is False
+                assert "Okta API error after retries" in error
+            calls_before = mock_load.call_count
+            
+            success, error = await process_enrichment_message(sample_message_data, mock_user_store)
+        
+        assert success is False
+        assert error == "Okta unavailable: Okta circuit breaker is open"
+        assert mock_load.call_count == calls_before
+        mock_user_store.put.assert_not_called()
+    
     @pytest.mark.asyncio
     async def test_process_enrichment_message_unexpected_error(self, sample_message_data, mock_user_store):
         """Test message processing with unexpected error."""
         from workers.enrichment_worker import process_enrichment_message
         
         # Mock unexpected error
-        with patch('workers.enrichment_worker.load_okta_user_by_email', 
+        with patch('app.services.okta_fetch.load_okta_user_by_email', 
                   side_effect=Exception("Unexpected error")):
             success, error = await process_enrichment_message(sample_message_data, mock_user_store)
             
@@ -147,9 +259,9 @@ class TestEnrichmentWorker:
     @pytest.mark.asyncio
     async def test_fetch_okta_data_with_retry_success(self, sample_okta_user):
         """Test successful Okta data fetching with retry."""
-        from workers.enrichment_worker import fetch_okta_data_with_retry
+        from app.services.okta_fetch import fetch_okta_data_with_retry
         
-        with patch('workers.enrichment_worker.load_okta_user_by_email', return_value=sample_okta_user):
+        with patch('app.services.okta_fetch.load_okta_user_by_email', return_value=sample_okta_user):
             result = await fetch_okta_data_with_retry("test.user@example.com")
             
             assert result == sample_okta_user
@@ -157,11 +269,11 @@ class TestEnrichmentWorker:
     @pytest.mark.asyncio
     async def test_fetch_okta_data_with_retry_transient_error(self, sample_okta_user):
         """Test Okta data fetching with transient error and retry."""
-        from workers.enrichment_worker import fetch_okta_data_with_retry
+        from app.services.okta_fetch import fetch_okta_data_with_retry
         from app.exceptions import OktaAPIError
         
         # Mock transient error on first call, success on second
-        with patch('workers.enrichment_worker.load_okta_user_by_email') as mock_load:
+        with patch('app.services.okta_fetch.load_okta_user_by_email') as mock_load:
             mock_load.side_effect = [OktaAPIError("Temporary error", status_code=503), sample_okta_user]
             
             result = await fetch_okta_data_with_retry("test.user@example.com")
@@ -172,10 +284,10 @@ class TestEnrichmentWorker:
     @pytest.mark.asyncio
     async def test_fetch_okta_data_with_retry_permanent_error(self):
         """Test Okta data fetching with permanent error (no retry)."""
-        from workers.enrichment_worker import fetch_okta_data_with_retry
+        from app.services.okta_fetch import fetch_okta_data_with_retry
         from app.exceptions import OktaUserNotFoundError
         
-        with patch('workers.enrichment_worker.load_okta_user_by_email') as mock_load:
+        with patch('app.services.okta_fetch.load_okta_user_by_email') as mock_load:
             mock_load.side_effect = OktaUserNotFoundError("test.user@example.com")
             
             with pytest.raises(OktaUserNotFoundError):
@@ -195,7 +307,7 @@ class TestEnrichmentWorker:
         
         error_message = "Test error message"
         
-        await publish_to_dlq(mock_producer, "test.dlq", sample_message_data, error_message)
+        assert await publish_to_dlq(mock_producer, "test.dlq", sample_message_data, error_message) is True
         
         # Verify producer was called
         mock_producer.produce.assert_called_once()
@@ -203,16 +315,30 @@ class TestEnrichmentWorker:
         
         assert call_args[1]["topic"] == "test.dlq"
         assert call_args[1]["key"] == b"12345"
+        assert call_args[1]["on_delivery"] is None
         
         # Verify message content
         message_data = json.loads(call_args[1]["value"].decode('utf-8'))
         assert message_data["employee_id"] == "12345"
         assert message_data["error"] == error_message
         assert message_data["original_topic"] == "user.enrichment.requested"
-        assert "failed_at" in message_data
+        assert abs(message_data["failed_at"] - time.time()) < 60
         
-        # Verify flush was called
-        mock_producer.flush.assert_called_once_with(timeout=5)
+        # Remaining delivery reports are served by the flush before the next commit
+        mock_producer.poll.assert_called_once_with(0)
+        mock_producer.flush.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_publish_to_dlq_records_source_topic(self, sample_message_data):
+        """Test that the DLQ message names the configured source topic."""
+        from workers.enrichment_worker import publish_to_dlq
+        
+        mock_producer = Mock()
+        
+        await publish_to_dlq(mock_producer, "test.dlq", sample_message_data, "Test error", "custom.requested")
+        
+        message_data = json.loads(mock_producer.produce.call_args[1]["value"])
+        assert message_data["original_topic"] == "custom.requested"
     
     @pytest.mark.asyncio
     async def test_publish_to_dlq_error(self, sample_message_data):
@@ -220,11 +346,10 @@ class TestEnrichmentWorker:
         from workers.enrichment_worker import publish_to_dlq
         
         mock_producer = Mock()
-        mock_producer.produce = Mock()
-        mock_producer.flush = Mock(side_effect=Exception("Flush error"))
+        mock_producer.produce = Mock(side_effect=Exception("Produce error"))
         
-        # Should not raise exception
-        await publish_to_dlq(mock_producer, "test.dlq", sample_message_data, "Test error")
+        # Should not raise exception, but report the failure
+        assert await publish_to_dlq(mock_producer, "test.dlq", sample_message_data, "Test error") is False
         
         # Verify producer was still called
         mock_producer.produce.assert_called_once()
@@ -247,7 +372,7 @@ class TestEnrichmentWorkerIntegration:
         """Mock Kafka producer for testing."""
         producer = Mock()
         producer.produce = Mock()
-        producer.flush = Mock()
+        producer.flush = Mock(return_value=0)
         producer.close = Mock()
         return producer
     
@@ -262,45 +387,330 @@ class TestEnrichmentWorkerIntegration:
         msg = mock_kafka_consumer.poll(timeout=1.0)
         assert msg is None
     
-    def test_consumer_poll_with_message(self, mock_kafka_consumer, mock_kafka_producer, mock_user_store):
+    def test_consumer_poll_with_message(self, mock_kafka_consumer, mock_kafka_producer, mock_user_store, fake_kafka_message):
         """Test consumer polling with message."""
         from workers.enrichment_worker import run_consumer
         
-        # Mock message
-        mock_msg = Mock()
-        mock_msg.error.return_value = None
-        mock_msg.value.return_value = json.dumps({
-            "employee_id": "12345",
-            "email": "test.user@example.com",
-            "first_name": "Jane",
-            "last_name": "Doe",
-            "correlation_id": "test-123"
-        }).encode('utf-8')
-        mock_msg.key.return_value = b"12345"
-        mock_msg.partition.return_value = 0
-        mock_msg.offset.return_value = 123
+        msg = fake_kafka_message(
+            value=json.dumps({
+                "employee_id": "12345",
+                "email": "test.user@example.com",
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "correlation_id": "test-123"
+            }).encode('utf-8'),
+            key=b"12345",
+            partition=0,
+            offset=123
+        )
         
-        mock_kafka_consumer.poll.return_value = mock_msg
+        mock_kafka_consumer.poll.return_value = msg
         
         # Test message processing
         msg = mock_kafka_consumer.poll(timeout=1.0)
         assert msg is not None
         assert msg.error() is None
     
-    def test_consumer_poll_with_error(self, mock_kafka_consumer, mock_kafka_producer, mock_user_store):
+    def test_consumer_poll_with_error(self, mock_kafka_consumer, mock_kafka_producer, mock_user_store, fake_kafka_message):
         """Test consumer polling with error."""
         from workers.enrichment_worker import run_consumer
         
-        # Mock error message
-        mock_msg = Mock()
-        mock_error = Mock()
-        mock_error.code.return_value = KafkaError._PARTITION_EOF
-        mock_msg.error.return_value = mock_error
+        msg = fake_kafka_message(error=KafkaError(KafkaError._PARTITION_EOF))
         
-        mock_kafka_consumer.poll.return_value = mock_msg
+        mock_kafka_consumer.poll.return_value = msg
         
         # Test error handling
         msg = mock_kafka_consumer.poll(timeout=1.0)
         assert msg is not None
         assert msg.error() is not None
         assert msg.error().code() == KafkaError._PARTITION_EOF
+    
+    @pytest.mark.asyncio
+    async def test_run_consumer_enriches_batch_concurrently(self, mock_kafka_consumer, mock_kafka_producer,
+                                                            mock_user_store, fake_kafka_message, monkeypatch):
+        """Test that messages for different users are enriched concurrently and their offsets committed together."""
+        import asyncio
+        import workers.enrichment_worker as worker
+        
+        messages = [
+            fake_kafka_message(value=json.dumps({"employee_id": str(i), "email": f"user{i}@example.com"}).encode(),
+                               key=str(i).encode(), topic="test.topic", partition=0, offset=i)
+            for i in range(3)
+        ]
+        
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        
+        def consume(num_messages, timeout):
+            if mock_kafka_consumer.consume.call_count == 1:
+                return messages
+            loop.call_soon_threadsafe(stop_event.set)
+            return []
+        mock_kafka_consumer.consume = Mock(side_effect=consume)
+        
+        in_flight = 0
+        max_in_flight = 0
+        
+        async def process(message_value, store, trust_schema=False):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return True, None
+        
+        monkeypatch.setattr(worker, "create_kafka_consumer", lambda settings, topic: mock_kafka_consumer)
+        monkeypatch.setattr(worker, "create_kafka_producer", lambda settings: mock_kafka_producer)
+        monkeypatch.setattr(worker, "get_user_store", lambda: mock_user_store)
+        monkeypatch.setattr(worker, "process_enrichment_message", process)
+        monkeypatch.setattr(worker, "close_okta_clients", AsyncMock())
+        monkeypatch.setattr(worker, "install_shutdown_handlers", Mock())
+        monkeypatch.setattr(worker, "remove_shutdown_handlers", Mock())
+        
+        await worker.run_consumer(stop_event)
+        
+        assert max_in_flight == 3
+        mock_kafka_consumer.commit.assert_called_once_with(
+            offsets=[TopicPartition("test.topic", 0, 3)],
+            asynchronous=False
+        )
+    
+    @pytest.mark.asyncio
+    async def test_run_consumer_enriches_same_key_in_order(self, mock_kafka_consumer, mock_kafka_producer,
+                                                          mock_user_store, fake_kafka_message, monkeypatch):
+        """Test that messages with the same key are enriched one at a time, in consumed order."""
+        import asyncio
+        import workers.enrichment_worker as worker
+        
+        # The older event is slower to enrich than the newer one
+        delays = {0: 0.05, 1: 0.0}
+        messages = [
+            fake_kafka_message(value=json.dumps({"employee_id": "12345", "seq": i}).encode(),
+                               key=b"12345", topic="test.topic", partition=0, offset=i)
+            for i in delays
+        ]
+        
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        
+        def consume(num_messages, timeout):
+            if mock_kafka_consumer.consume.call_count == 1:
+                return messages
+            loop.call_soon_threadsafe(stop_event.set)
+            return []
+        mock_kafka_consumer.consume = Mock(side_effect=consume)
+        
+        finished = []
+        
+        async def process(message_value, store, trust_schema=False):
+            await asyncio.sleep(delays[message_value["seq"]])
+            finished.append(message_value["seq"])
+            return True, None
+        
+        monkeypatch.setattr(worker, "create_kafka_consumer", lambda settings, topic: mock_kafka_consumer)
+        monkeypatch.setattr(worker, "create_kafka_producer", lambda settings: mock_kafka_producer)
+        monkeypatch.setattr(worker, "get_user_store", lambda: mock_user_store)
+        monkeypatch.setattr(worker, "process_enrichment_message", process)
+        monkeypatch.setattr(worker, "close_okta_clients", AsyncMock())
+        monkeypatch.setattr(worker, "install_shutdown_handlers", Mock())
+        monkeypatch.setattr(worker, "remove_shutdown_handlers", Mock())
+        
+        await worker.run_consumer(stop_event)
+        
+        assert finished == [0, 1]
+        mock_kafka_consumer.commit.assert_called_once_with(
+            offsets=[TopicPartition("test.topic", 0, 2)],
+            asynchronous=False
+        )
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("failed_deliveries,produce_calls", [(0, 1), (1, 2), (5, 3)],
+                             ids=["delivered", "transient-failure", "gives-up"])
+    async def test_run_consumer_commits_dlq_offset_after_delivery(self, mock_kafka_consumer, mock_kafka_producer,
+                                                                  mock_user_store, fake_kafka_message, monkeypatch,
+                                                                  failed_deliveries, produce_calls):
+        """Test that failed DLQ deliveries are retried a bounded number of times before the offset is committed."""
+        import asyncio
+        import workers.enrichment_worker as worker
+        
+        messages = [
+            fake_kafka_message(value=json.dumps({"employee_id": str(i), "email": f"user{i}@example.com"}).encode(),
+                               topic="test.topic", partition=0, offset=i)
+            for i in range(3)
+        ]
+        
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        
+        def consume(num_messages, timeout):
+            if mock_kafka_consumer.consume.call_count == 1:
+                return messages
+            loop.call_soon_threadsafe(stop_event.set)
+            return []
+        mock_kafka_consumer.consume = Mock(side_effect=consume)
+        
+        async def process(message_value, store, trust_schema=False):
+            if message_value["employee_id"] == "0":
+                return False, "Okta API error"
+            return True, None
+        
+        # The broker's delivery report arrives with the next poll
+        def poll(timeout):
+            on_delivery = mock_kafka_producer.produce.call_args[1]["on_delivery"]
+            failed = mock_kafka_producer.produce.call_count <= failed_deliveries
+            on_delivery(KafkaError(KafkaError._MSG_TIMED_OUT) if failed else None, None)
+        mock_kafka_producer.poll = Mock(side_effect=poll)
+        
+        monkeypatch.setattr(worker, "create_kafka_consumer", lambda settings, topic: mock_kafka_consumer)
+        monkeypatch.setattr(worker, "create_kafka_producer", lambda settings: mock_kafka_producer)
+        monkeypatch.setattr(worker, "get_user_store", lambda: mock_user_store)
+        monkeypatch.setattr(worker, "process_enrichment_message", process)
+        monkeypatch.setattr(worker, "close_okta_clients", AsyncMock())
+        monkeypatch.setattr(worker, "install_shutdown_handlers", Mock())
+        monkeypatch.setattr(worker, "remove_shutdown_handlers", Mock())
+        
+        await worker.run_consumer(stop_event)
+        
+        assert mock_kafka_producer.produce.call_count == produce_calls
+        mock_kafka_consumer.commit.assert_called_once_with(
+            offsets=[TopicPartition("test.topic", 0, 3)],
+            asynchronous=False
+        )
+    
+    @pytest.mark.asyncio
+    async def test_dlq_publisher_gives_up_after_failed_produces(self, mock_kafka_producer, fake_kafka_message, caplog):
+        """Test that a DLQ produce that keeps failing is logged and its offset finished after the last attempt."""
+        import asyncio
+        from workers.enrichment_worker import DLQ_MAX_ATTEMPTS, DlqPublisher
+        
+        mock_kafka_producer.produce.side_effect = BufferError("Local: Queue full")
+        msg = fake_kafka_message(topic="test.topic", partition=0, offset=7)
+        finished = []
+        dlq = DlqPublisher(mock_kafka_producer, "test.dlq", "test.topic", asyncio.get_running_loop(), finished.append)
+        
+        with caplog.at_level("ERROR"):
+            assert dlq.publish(msg, {"employee_id": "12345"}, "Okta API error") is False
+        
+        assert mock_kafka_producer.produce.call_count == DLQ_MAX_ATTEMPTS
+        assert finished == [msg]
+        assert "Giving up on DLQ delivery for offset 7 on test.topic[0]" in caplog.text
+    
+    @pytest.mark.asyncio
+    async def test_shutdown_signal_sets_stop_event(self):
+        """Test that SIGTERM sets the stop event and the handler is removed afterwards."""
+        import asyncio
+        import signal
+        from workers.enrichment_worker import install_shutdown_handlers, remove_shutdown_handlers
+        
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        previous = signal.getsignal(signal.SIGTERM)
+        
+        install_shutdown_handlers(loop, stop_event)
+        try:
+            signal.raise_signal(signal.SIGTERM)
+            await asyncio.wait_for(stop_event.wait(), timeout=1)
+        finally:
+            remove_shutdown_handlers(loop)
+            signal.signal(signal.SIGTERM, previous)
+        
+        assert stop_event.is_set()
+    
+    def test_worker_index_routes_by_key(self, fake_kafka_message):
+        """Test that messages sharing a key, or unkeyed messages sharing a partition, go to one worker."""
+        from workers.enrichment_worker import worker_index
+        
+        keyed = [fake_kafka_message(key=b"12345", partition=p) for p in range(4)]
+        unkeyed = [fake_kafka_message(partition=3) for _ in range(2)]
+        
+        assert len({worker_index(msg, 10) for msg in keyed}) == 1
+        assert {worker_index(msg, 10) for msg in unkeyed} == {3}
+        assert all(0 <= worker_index(fake_kafka_message(key=str(i).encode()), 4) < 4 for i in range(20))
+    
+    def test_offset_tracker_waits_for_earlier_offsets(self, fake_kafka_message):
+        """Test that a finished offset is only committable once earlier ones in its partition finish."""
+        from workers.enrichment_worker import OffsetTracker
+        
+        tracker = OffsetTracker()
+        first, second = (fake_kafka_message(topic="test.topic", partition=0, offset=i) for i in (7, 8))
+        other = fake_kafka_message(topic="test.topic", partition=1, offset=3)
+        for msg in (first, second, other):
+            tracker.start(msg)
+        
+        tracker.finish(second)
+        tracker.finish(other)
+        assert tracker.pending == {("test.topic", 1): 4}
+        
+        tracker.finish(first)
+        assert tracker.pending == {("test.topic", 0): 9, ("test.topic", 1): 4}
+        assert tracker.pending_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_committer_commits_when_batch_due(self, mock_kafka_consumer, mock_kafka_producer):
+        """Test that the committer commits as soon as a batch is due rather than waiting for the interval."""
+        import asyncio
+        from workers.enrichment_worker import OffsetTracker, run_committer
+        
+        tracker = OffsetTracker()
+        tracker.pending[("test.topic", 0)] = 5
+        commit_due = asyncio.Event()
+        commit_due.set()
+        
+        committer = asyncio.create_task(
+            run_committer(mock_kafka_consumer, mock_kafka_producer, tracker, commit_due, interval=60)
+        )
+        try:
+            for _ in range(100):
+                if mock_kafka_consumer.commit.called:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            committer.cancel()
+        
+        mock_kafka_consumer.commit.assert_called_once_with(
+            offsets=[TopicPartition("test.topic", 0, 5)],
+            asynchronous=True
+        )
+        assert tracker.pending == {}
+    
+    @pytest.mark.asyncio
+    async def test_commit_offsets_flushes_dlq_first(self, mock_kafka_consumer, mock_kafka_producer):
+        """Test that buffered offsets are committed in one call after the DLQ is flushed."""
+        from workers.enrichment_worker import DLQ_FLUSH_TIMEOUT_SECONDS, commit_offsets
+        
+        order = []
+        mock_kafka_producer.flush.side_effect = lambda timeout: order.append("flush") or 0
+        mock_kafka_consumer.commit.side_effect = lambda **kwargs: order.append("commit")
+        pending = {("test.topic", 0): 5, ("test.topic", 1): 9}
+        
+        await commit_offsets(mock_kafka_consumer, mock_kafka_producer, pending)
+        
+        assert order == ["flush", "commit"]
+        mock_kafka_producer.flush.assert_called_once_with(DLQ_FLUSH_TIMEOUT_SECONDS)
+        mock_kafka_consumer.commit.assert_called_once_with(
+            offsets=[TopicPartition("test.topic", 0, 5), TopicPartition("test.topic", 1, 9)],
+            asynchronous=True
+        )
+        assert pending == {}
+    
+    @pytest.mark.asyncio
+    async def test_commit_offsets_noop_when_empty(self, mock_kafka_consumer, mock_kafka_producer):
+        """Test that nothing is committed without buffered offsets."""
+        from workers.enrichment_worker import commit_offsets
+        
+        await commit_offsets(mock_kafka_consumer, mock_kafka_producer, {})
+        
+        mock_kafka_consumer.commit.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_commit_offsets_skipped_while_dlq_undelivered(self, mock_kafka_consumer, mock_kafka_producer):
+        """Test that the commit is skipped and offsets kept when the DLQ flush times out."""
+        from workers.enrichment_worker import commit_offsets
+        
+        mock_kafka_producer.flush.return_value = 2
+        pending = {("test.topic", 0): 5}
+        
+        await commit_offsets(mock_kafka_consumer, mock_kafka_producer, pending)
+        
+        mock_kafka_consumer.commit.assert_not_called()
+        assert pending == {("test.topic", 0): 5}
@@ -3,238 +3,187 @@ Tests for API middleware (authentication, request validation).
 """
 
 import pytest
-from unittest.mock import patch, Mock
-from fastapi import FastAPI, Request
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
-from starlette.responses import PlainTextResponse
 
 from app.middleware import APIKeyMiddleware, verify_api_key
 from app.config import Settings
 from app.exceptions import AuthenticationError
 
 
-class TestAPIKeyMiddleware:
-    """Test API key middleware for endpoint protection."""
+@pytest.fixture(scope="module")
+def middleware_test_app():
+    """Build one FastAPI app with every route exercised by the middleware tests."""
+    app = FastAPI()
     
-    def test_middleware_allows_unprotected_paths_without_key(self):
-        """Test that unprotected paths work without API key."""
-        # Create test app
-        app = FastAPI()
-        
-        @app.get("/public")
-        async def public_endpoint():
-            return {"message": "public"}
-        
-        # Create settings without API key
-        test_settings = Settings(
-            OKTA_ORG_URL="https://test.okta.com",
-            OKTA_API_TOKEN="test-token",
-            API_KEY=None
-        )
-        
-        with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            response = client.get("/public")
-            
-            assert response.status_code == 200
+    @app.get("/public")
+    async def public_endpoint():
+        return {"message": "public"}
     
-    def test_middleware_allows_protected_paths_when_no_key_configured(self):
-        """Test that protected paths work when API key is not configured (dev mode)."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"status": "ok"}
-        
-        # No API key configured
-        test_settings = Settings(
-            OKTA_ORG_URL="https://test.okta.com",
-            OKTA_API_TOKEN="test-token",
-            API_KEY=None
-        )
-        
-        with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            response = client.post("/v1/hr/webhook")
-            
-            # Should allow access without key in dev mode
-            assert response.status_code == 200
+    @app.post("/v1/hr/webhook")
+    async def webhook():
+        return {"status": "ok"}
     
-    def test_middleware_blocks_protected_path_without_key(self):
-        """Test that protected paths are blocked without API key when configured."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"status": "ok"}
-        
-        # API key configured
-        test_settings = Settings(
-            OKTA_ORG_URL="https://test.okta.com",
-            OKTA_API_TOKEN="test-token",
-            API_KEY="secret-api-key-123"
-        )
-        
-        with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            
-            # Middleware should raise HTTPException which TestClient converts to response
-            from fastapi import HTTPException
-            with pytest.raises(HTTPException) as exc_info:
-                response = client.post("/v1/hr/webhook")
-            
-            assert exc_info.value.status_code == 401
-            assert "API key required" in str(exc_info.value.detail)
+    @app.post("/v1/admin/action")
+    async def admin_action():
+        return {"endpoint": "admin"}
     
-    def test_middleware_blocks_protected_path_with_invalid_key(self):
-        """Test that protected paths are blocked with invalid API key."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"status": "ok"}
-        
-        test_settings = Settings(
-            OKTA_ORG_URL="https://test.okta.com",
-            OKTA_API_TOKEN="test-token",
-            API_KEY="correct-key-123"
-        )
-        
-        with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            
-            from fastapi import HTTPException
-            with pytest.raises(HTTPException) as exc_info:
-                response = client.post(
-                    "/v1/hr/webhook",
-                    headers={"X-API-Key": "wrong-key-456"}
-                )
-            
-            assert exc_info.value.status_code == 403
-            assert "Invalid API key" in str(exc_info.value.detail)
+    @app.post("/v1/admin/users")
+    async def admin_users():
+        return {"endpoint": "admin-users"}
     
-    def test_middleware_allows_protected_path_with_valid_key(self):
-        """Test that protected paths work with valid API key."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"status": "ok"}
-        
+    @app.post("/v1/administrator")
+    async def administrator():
+        return {"endpoint": "administrator"}
+    
+    @app.get("/v1/public")
+    async def public():
+        return {"endpoint": "public"}
+    
+    @app.post("/v1/protected/{item}")
+    async def protected(item: str):
+        return {"item": item}
+    
+    return app
+
+
+@pytest.fixture
+def make_client(middleware_test_app):
+    """Return a factory wrapping the shared app in APIKeyMiddleware for a given API key."""
+    def _make(api_key, protected_paths=("/v1/hr/webhook",)):
         test_settings = Settings(
             OKTA_ORG_URL="https://test.okta.com",
             OKTA_API_TOKEN="test-token",
-            API_KEY="correct-key-123"
+            API_KEY=api_key
         )
-        
         with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            response = client.post(
-                "/v1/hr/webhook",
-                headers={"X-API-Key": "correct-key-123"}
-            )
-            
-            assert response.status_code == 200
+            middleware = APIKeyMiddleware(middleware_test_app, protected_paths=protected_paths)
+        return TestClient(middleware)
+    
+    return _make
+
+
+class TestAPIKeyMiddleware:
+    """Test API key middleware for endpoint protection."""
+    
+    @pytest.mark.parametrize("api_key,protected_paths,method,path,headers,expected_status,expected_detail", [
+        # Dev mode (no key configured): everything passes
+        (None, ("/v1/hr/webhook",), "GET", "/public", {}, 200, None),
+        (None, ("/v1/hr/webhook",), "POST", "/v1/hr/webhook", {}, 200, None),
+        # Key configured: protected path needs the exact key
+        ("secret-api-key-123", ("/v1/hr/webhook",), "POST", "/v1/hr/webhook", {}, 401, "API key required"),
+        ("correct-key-123", ("/v1/hr/webhook",), "POST", "/v1/hr/webhook",
+         {"X-API-Key": "wrong-key-456"}, 403, "Invalid API key"),
+        ("correct-key-123", ("/v1/hr/webhook",), "POST", "/v1/hr/webhook",
+         {"X-API-Key": "correct-key-123"}, 200, None),
+        # Multiple protected paths
+        ("secret-key", ("/v1/hr/webhook", "/v1/admin/action"), "POST", "/v1/hr/webhook", {}, 401, "API key required"),
+        ("secret-key", ("/v1/hr/webhook", "/v1/admin/action"), "POST", "/v1/admin/action", {}, 401, "API key required"),
+        ("secret-key", ("/v1/hr/webhook", "/v1/admin/action"), "GET", "/v1/public", {}, 200, None),
+        ("secret-key", ("/v1/hr/webhook", "/v1/admin/action"), "POST", "/v1/hr/webhook",
+         {"X-API-Key": "secret-key"}, 200, None),
+        ("secret-key", ("/v1/hr/webhook", "/v1/admin/action"), "POST", "/v1/admin/action",
+         {"X-API-Key": "secret-key"}, 200, None),
+        # Key comparison is case-sensitive
+        ("SecretKey123", ("/v1/hr/webhook",), "POST", "/v1/hr/webhook",
+         {"X-API-Key": "secretkey123"}, 403, "Invalid API key"),
+        ("SecretKey123", ("/v1/hr/webhook",), "POST", "/v1/hr/webhook",
+         {"X-API-Key": "SecretKey123"}, 200, None),
+    ], ids=[
+        "dev-mode-unprotected",
+        "dev-mode-protected",
+        "missing-key",
+        "wrong-key",
+        "valid-key",
+        "multi-path-webhook-missing-key",
+        "multi-path-admin-missing-key",
+        "multi-path-public",
+        "multi-path-webhook-valid-key",
+        "multi-path-admin-valid-key",
+        "case-sensitive-wrong-case",
+        "case-sensitive-exact-case",
+    ])
+    def test_middleware_api_key_enforcement(
+        self, make_client, api_key, protected_paths, method, path, headers, expected_status, expected_detail
+    ):
+        """Test API key enforcement across configured keys, paths and headers."""
+        client = make_client(api_key=api_key, protected_paths=protected_paths)
+        response = client.request(method, path, headers=headers)
+        
+        assert response.status_code == expected_status
+        if expected_detail is not None:
+            assert response.json()["detail"] == expected_detail
+        if expected_status == 401:
+            assert response.headers["WWW-Authenticate"] == "ApiKey"
+        if expected_status == 200 and path == "/v1/hr/webhook":
+            # Allowed requests reach the route itself
             assert response.json()["status"] == "ok"
     
-    def test_middleware_protects_multiple_paths(self):
-        """Test that middleware can protect multiple paths."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"endpoint": "webhook"}
-        
-        @app.post("/v1/admin/action")
-        async def admin_action():
-            return {"endpoint": "admin"}
-        
-        @app.get("/v1/public")
-        async def public():
-            return {"endpoint": "public"}
-        
+    def test_middleware_protects_prefix_paths(self, make_client):
+        """Test that a trailing /* protects every path under the prefix."""
+        client = make_client(api_key="secret-key", protected_paths=("/v1/admin/*",))
+        
+        assert client.post("/v1/admin/users").status_code == 401
+        assert client.post(
+            "/v1/admin/users", headers={"X-API-Key": "secret-key"}
+        ).status_code == 200
+        # Prefix match is segment-aware
+        assert client.post("/v1/administrator").status_code == 200
+    
+    def test_middleware_protects_many_paths(self, make_client):
+        """Test that every entry of a large protected path list is enforced."""
+        paths = tuple(f"/v1/protected/{i}" for i in range(50))
+        client = make_client(api_key="secret-key", protected_paths=paths)
+        
+        for path in (paths[0], paths[25], paths[-1]):
+            assert client.post(path).status_code == 401
+        assert client.post("/v1/protected/50").status_code == 200
+    
+    @pytest.mark.parametrize("wrong_key", [
+        "XecretKey123",  # differs at first byte
+        "SecretKey12X",  # differs at last byte
+        "0" * len("SecretKey123"),
+    ])
+    def test_middleware_rejects_equal_length_wrong_keys(self, make_client, wrong_key):
+        """Test that wrong keys of the same length are rejected wherever they differ."""
+        client = make_client(api_key="SecretKey123")
+        response = client.post("/v1/hr/webhook", headers={"X-API-Key": wrong_key})
+        
+        assert response.status_code == 403
+    
+    def test_middleware_allows_options_preflight(self, middleware_test_app):
+        """Test that CORS preflights reach the CORS middleware without an API key."""
         test_settings = Settings(
             OKTA_ORG_URL="https://test.okta.com",
             OKTA_API_TOKEN="test-token",
             API_KEY="secret-key"
         )
-        
+        cors_app = CORSMiddleware(
+            middleware_test_app,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
         with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(
-                APIKeyMiddleware,
-                protected_paths=["/v1/hr/webhook", "/v1/admin/action"]
-            )
-            
-            client = TestClient(app)
-            
-            # Protected paths without key should fail
-            from fastapi import HTTPException
-            with pytest.raises(HTTPException) as exc_info:
-                client.post("/v1/hr/webhook")
-            assert exc_info.value.status_code == 401
-            
-            with pytest.raises(HTTPException) as exc_info:
-                client.post("/v1/admin/action")
-            assert exc_info.value.status_code == 401
-            
-            # Public path should work
-            assert client.get("/v1/public").status_code == 200
-            
-            # Protected paths with valid key should work
-            headers = {"X-API-Key": "secret-key"}
-            assert client.post("/v1/hr/webhook", headers=headers).status_code == 200
-            assert client.post("/v1/admin/action", headers=headers).status_code == 200
-    
-    def test_middleware_case_sensitive_key(self):
-        """Test that API key comparison is case-sensitive."""
-        app = FastAPI()
-        
-        @app.post("/v1/hr/webhook")
-        async def webhook():
-            return {"status": "ok"}
-        
-        test_settings = Settings(
-            OKTA_ORG_URL="https://test.okta.com",
-            OKTA_API_TOKEN="test-token",
-            API_KEY="SecretKey123"
+            client = TestClient(APIKeyMiddleware(cors_app, protected_paths=("/v1/hr/webhook",)))
+        
+        response = client.options(
+            "/v1/hr/webhook",
+            headers={
+                "Origin": "https://example.com",
+                "Access-Control-Request-Method": "POST",
+            }
         )
         
-        with patch('app.middleware.get_settings', return_value=test_settings):
-            app.add_middleware(APIKeyMiddleware, protected_paths=["/v1/hr/webhook"])
-            
-            client = TestClient(app)
-            
-            # Wrong case should fail
-            from fastapi import HTTPException
-            with pytest.raises(HTTPException) as exc_info:
-                response = client.post(
-                    "/v1/hr/webhook",
-                    headers={"X-API-Key": "secretkey123"}
-                )
-            assert exc_info.value.status_code == 403
-            
-            # Correct case should work
-            response = client.post(
-                "/v1/hr/webhook",
-                headers={"X-API-Key": "SecretKey123"}
-            )
-            assert response.status_code == 200
+        assert response.status_code == 200
+        assert "access-control-allow-origin" in response.headers
 
 
 class TestVerifyAPIKeyDependency:
     """Test the verify_api_key dependency function."""
     
-    @pytest.mark.asyncio
     async def test_verify_api_key_dev_mode(self):
         """Test API key verification in dev mode (no key configured)."""
         test_settings = Settings(
@@ -247,7 +196,6 @@ class TestVerifyAPIKeyDependency:
             result = await verify_api_key(None)
             assert result == "dev-mode"
     
-    @pytest.mark.asyncio
     async def test_verify_api_key_missing(self):
         """Test API key verification when key is missing."""
         test_settings = Settings(
@@ -260,7 +208,6 @@ class TestVerifyAPIKeyDependency:
             with pytest.raises(AuthenticationError, match="API key required"):
                 await verify_api_key(None)
     
-    @pytest.mark.asyncio
     async def test_verify_api_key_invalid(self):
         """Test API key verification with invalid key."""
         test_settings = Settings(
@@ -273,7 +220,6 @@ class TestVerifyAPIKeyDependency:
             with pytest.raises(AuthenticationError, match="Invalid API key"):
                 await verify_api_key("wrong-key")
     
-    @pytest.mark.asyncio
     async def test_verify_api_key_valid(self):
         """Test API key verification with valid key."""
         test_settings = Settings(
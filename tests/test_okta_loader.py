@@ -2,16 +2,21 @@
 Tests for Okta loader service (async implementation with httpx).
 """
 
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, Mock, AsyncMock
+from unittest.mock import AsyncMock, Mock, patch
 import httpx
+import respx
 
 from app.services.okta_loader import (
     load_okta_user_by_email,
     _find_okta_user_by_email,
     _get_user_groups,
     _get_user_applications,
-    _auth_headers
+    _auth_headers,
+    _get_client,
+    close_okta_clients
 )
 from app.schemas import OktaUser
 from app.config import Settings
@@ -33,72 +38,155 @@ class TestAuthHeaders:
         assert headers["Authorization"] == "SSWS test-token-123"
         assert headers["Accept"] == "application/json"
         assert headers["Content-Type"] == "application/json"
+    
+    def test_auth_headers_cached_and_read_only(self):
+        """Test that headers are built once per token and cannot be mutated."""
+        headers = _auth_headers("test-token-123")
+        
+        assert _auth_headers("test-token-123") is headers
+        with pytest.raises(TypeError):
+            headers["Authorization"] = "SSWS other"
+
+
+class TestSharedClient:
+    """Test the shared Okta HTTP client."""
+    
+    def test_get_client_is_reused(self):
+        """Test that the same client instance is returned on every call."""
+        client = _get_client("https://test.okta.com")
+        
+        assert isinstance(client, httpx.AsyncClient)
+        assert client.base_url == "https://test.okta.com"
+        assert _get_client("https://test.okta.com") is client
+    
+    @pytest.mark.asyncio
+    async def test_close_okta_clients(self):
+        """Test that closing drops shared clients and a fresh one is built on next use."""
+        client = _get_client("https://test.okta.com")
+        
+        await close_okta_clients()
+        
+        assert client.is_closed
+        new_client = _get_client("https://test.okta.com")
+        assert new_client is not client
+        assert not new_client.is_closed
+
+
+def _mock_outcome(route, outcome, make_response):
+    """Make a respx route answer with an HTTP status code or raise an exception."""
+    if isinstance(outcome, int):
+        route.mock(return_value=make_response(status=outcome))
+    else:
+        route.mock(side_effect=outcome)
+
+
+@pytest.fixture
+def okta_api():
+    """Mock the Okta API at the httpx transport layer."""
+    with respx.mock(base_url="https://test.okta.com", assert_all_called=False) as router:
+        yield router
 
 
 class TestFindOktaUserByEmail:
     """Test Okta user search functionality."""
     
     @pytest.mark.asyncio
-    async def test_find_user_success(self):
+    async def test_find_user_success(self, okta_api, make_response):
         """Test successful user search by email."""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        route = okta_api.get("/api/v1/users").mock(return_value=make_response([
             {
                 "id": "user123",
                 "profile": {"email": "test@example.com", "firstName": "Test", "lastName": "User"}
             }
-        ]
+        ]))
         
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        user = await _find_okta_user_by_email(
+            email="test@example.com",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
         
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            user = await _find_okta_user_by_email(
-                email="test@example.com",
-                base_url="https://test.okta.com",
-                token="token123",
-                timeout=10
-            )
-            
-            assert user is not None
-            assert user["id"] == "user123"
-            assert user["profile"]["email"] == "test@example.com"
+        assert user is not None
+        assert user["id"] == "user123"
+        assert user["profile"]["email"] == "test@example.com"
+        
+        request = route.calls.last.request
+        assert request.headers["Authorization"] == "SSWS token123"
+        assert request.url.params["search"] == 'profile.email eq "test@example.com"'
+    
+    @pytest.mark.asyncio
+    async def test_search_url_uses_limit_1(self, okta_api, make_response):
+        """Test that the email search asks Okta for a single result."""
+        route = okta_api.get("/api/v1/users").mock(return_value=make_response([]))
+        
+        await _find_okta_user_by_email(
+            email="test@example.com",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert route.calls.last.request.url.params["limit"] == "1"
+        assert route.calls.last.request.url.params["expand"] == "groups"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("email,expected_filter", [
+        ("first+tag@example.com", 'profile.email eq "first+tag@example.com"'),
+        ('odd"quote@example.com', 'profile.email eq "odd\\"quote@example.com"'),
+    ], ids=["plus-sign", "double-quote"])
+    async def test_search_url_encodes_email(self, okta_api, make_response, email, expected_filter):
+        """Test that special characters in the email survive URL encoding and cannot break the filter."""
+        route = okta_api.get("/api/v1/users").mock(return_value=make_response([]))
+        
+        await _find_okta_user_by_email(
+            email=email,
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert route.calls.last.request.url.params["search"] == expected_filter
     
     @pytest.mark.asyncio
-    async def test_find_user_not_found(self):
+    async def test_find_user_not_found(self, okta_api, make_response):
         """Test user search when user is not found."""
-        mock_response = Mock()
-        mock_response.json.return_value = []
+        okta_api.get("/api/v1/users").mock(return_value=make_response([]))
         
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        user = await _find_okta_user_by_email(
+            email="notfound@example.com",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
         
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            user = await _find_okta_user_by_email(
-                email="notfound@example.com",
+        assert user is None
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("outcome,match", [
+        (401, "Okta API error: 401"),
+        (httpx.TimeoutException("Request timeout"), "Okta API timeout"),
+        (httpx.ConnectError("Network error"), "Okta API request failed"),
+    ], ids=["http-error", "timeout", "request-error"])
+    async def test_find_user_errors(self, okta_api, make_response, outcome, match):
+        """Test that HTTP errors, timeouts and network errors raise OktaAPIError."""
+        _mock_outcome(okta_api.get("/api/v1/users"), outcome, make_response)
+        
+        with pytest.raises(OktaAPIError, match=match):
+            await _find_okta_user_by_email(
+                email="test@example.com",
                 base_url="https://test.okta.com",
                 token="token123",
                 timeout=10
             )
-            
-            assert user is None
     
     @pytest.mark.asyncio
-    async def test_find_user_http_error(self):
-        """Test user search when API returns HTTP error."""
-        mock_response = Mock()
-        mock_response.status_code = 401
-        
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.HTTPStatusError(
-            "Unauthorized",
-            request=Mock(),
-            response=mock_response
-        ))
-        mock_client.__aenter__.return_value.get = mock_get
-        
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            with pytest.raises(OktaAPIError, match="Okta API error: 401"):
+    async def test_find_user_unexpected_error(self, make_error_client):
+        """Test that unexpected client errors are wrapped in OktaAPIError."""
+        mock_client = make_error_client(RuntimeError("boom"))
+        
+        with patch('app.services.okta_loader._get_client', return_value=mock_client):
+            with pytest.raises(OktaAPIError, match="Unexpected error: boom"):
                 await _find_okta_user_by_email(
                     email="test@example.com",
                     base_url="https://test.okta.com",
@@ -107,166 +195,233 @@ class TestFindOktaUserByEmail:
                 )
     
     @pytest.mark.asyncio
-    async def test_find_user_timeout(self):
-        """Test user search timeout handling."""
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.TimeoutException("Request timeout"))
-        mock_client.__aenter__.return_value.get = mock_get
-        
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            with pytest.raises(OktaAPIError, match="Okta API timeout"):
+    async def test_find_user_uses_injected_client(self, make_error_client):
+        """Test that an explicitly passed client is used instead of the shared one."""
+        mock_client = make_error_client(RuntimeError("boom"))
+        
+        with patch('app.services.okta_loader._get_client') as mock_get_client:
+            with pytest.raises(OktaAPIError):
                 await _find_okta_user_by_email(
                     email="test@example.com",
                     base_url="https://test.okta.com",
                     token="token123",
-                    timeout=10
+                    timeout=10,
+                    client=mock_client
                 )
+        
+        mock_get_client.assert_not_called()
+        mock_client.get.assert_awaited_once()
+
+
+class TestOktaRateLimits:
+    """Test handling of Okta rate limit headers."""
+    
+    NOW = 1_700_000_000
+    
+    @pytest.mark.asyncio
+    async def test_429_waits_until_rate_limit_reset(self, okta_api, make_response):
+        """Test that a 429 is retried after the header-derived reset time, not an exponential delay."""
+        limited = make_response(status=429)
+        limited.headers["X-Rate-Limit-Reset"] = str(self.NOW + 7)
+        okta_api.get("/api/v1/users").mock(side_effect=[limited, make_response([{"id": "user123"}])])
+        
+        with patch('app.services.okta_loader.time.time', return_value=self.NOW), \
+             patch('app.services.okta_loader.random.uniform', return_value=0.25), \
+             patch('app.services.okta_loader.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            user = await _find_okta_user_by_email(
+                email="test@example.com",
+                base_url="https://test.okta.com",
+                token="token123",
+                timeout=10
+            )
+        
+        assert user == {"id": "user123"}
+        mock_sleep.assert_awaited_once_with(7.25)
     
     @pytest.mark.asyncio
-    async def test_find_user_request_error(self):
-        """Test user search network error handling."""
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.RequestError("Network error"))
-        mock_client.__aenter__.return_value.get = mock_get
-        
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            with pytest.raises(OktaAPIError, match="Okta API request failed"):
+    async def test_429_gives_up_after_retries(self, okta_api, make_response):
+        """Test that persistent 429s surface as an Okta API error."""
+        limited = make_response(status=429)
+        limited.headers["X-Rate-Limit-Reset"] = str(self.NOW + 1)
+        route = okta_api.get("/api/v1/users").mock(return_value=limited)
+        
+        with patch('app.services.okta_loader.time.time', return_value=self.NOW), \
+             patch('app.services.okta_loader.asyncio.sleep', new_callable=AsyncMock):
+            with pytest.raises(OktaAPIError, match="Okta API error: 429"):
                 await _find_okta_user_by_email(
                     email="test@example.com",
                     base_url="https://test.okta.com",
                     token="token123",
                     timeout=10
                 )
-
-
-class TestGetUserGroups:
-    """Test Okta groups retrieval."""
+        
+        assert route.call_count == 3
     
     @pytest.mark.asyncio
-    async def test_get_groups_success(self):
-        """Test successful groups retrieval."""
-        mock_response = Mock()
-        mock_response.json.return_value = [
-            {"profile": {"name": "Engineering"}},
-            {"profile": {"name": "Everyone"}}
-        ]
-        
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+    async def test_low_remaining_pauses_until_reset(self, okta_api, make_response):
+        """Test that a nearly exhausted rate limit window pauses until it resets."""
+        response = make_response([{"profile": {"name": "Everyone"}}])
+        response.headers["X-Rate-Limit-Remaining"] = "3"
+        response.headers["X-Rate-Limit-Reset"] = str(self.NOW + 4)
+        okta_api.get("/api/v1/users/user123/groups").mock(return_value=response)
         
-        with patch('httpx.AsyncClient', return_value=mock_client):
+        with patch('app.services.okta_loader.time.time', return_value=self.NOW), \
+             patch('app.services.okta_loader.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
             groups = await _get_user_groups(
                 user_id="user123",
                 base_url="https://test.okta.com",
                 token="token123",
                 timeout=10
             )
-            
-            assert "Engineering" in groups
-            assert "Everyone" in groups
-            assert len(groups) == 2
+        
+        assert groups == ["Everyone"]
+        mock_sleep.assert_awaited_once_with(4)
     
     @pytest.mark.asyncio
-    async def test_get_groups_http_error_returns_empty(self):
-        """Test that HTTP errors return empty list instead of raising."""
-        mock_response = Mock()
-        mock_response.status_code = 500
-        
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.HTTPStatusError(
-            "Server error",
-            request=Mock(),
-            response=mock_response
-        ))
-        mock_client.__aenter__.return_value.get = mock_get
-        
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            groups = await _get_user_groups(
+    async def test_healthy_remaining_does_not_pause(self, okta_api, make_response):
+        """Test that responses with plenty of remaining quota return immediately."""
+        response = make_response([])
+        response.headers["X-Rate-Limit-Remaining"] = "500"
+        response.headers["X-Rate-Limit-Reset"] = str(self.NOW + 4)
+        okta_api.get("/api/v1/users/user123/groups").mock(return_value=response)
+        
+        with patch('app.services.okta_loader.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            await _get_user_groups(
                 user_id="user123",
                 base_url="https://test.okta.com",
                 token="token123",
                 timeout=10
             )
-            
-            assert groups == []
+        
+        mock_sleep.assert_not_awaited()
+
+
+class TestGetUserGroups:
+    """Test Okta groups retrieval."""
+    
+    @pytest.mark.asyncio
+    async def test_get_groups_success(self, okta_api, make_response):
+        """Test successful groups retrieval."""
+        okta_api.get("/api/v1/users/user123/groups").mock(return_value=make_response([
+            {"profile": {"name": "Engineering"}},
+            {"profile": {"name": "Everyone"}}
+        ]))
+        
+        groups = await _get_user_groups(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert "Engineering" in groups
+        assert "Everyone" in groups
+        assert len(groups) == 2
     
     @pytest.mark.asyncio
-    async def test_get_groups_timeout_returns_empty(self):
-        """Test that timeout returns empty list."""
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.TimeoutException("Timeout"))
-        mock_client.__aenter__.return_value.get = mock_get
+    async def test_get_groups_name_fallbacks(self, okta_api, make_response):
+        """Test that groups without a profile name fall back to other fields."""
+        okta_api.get("/api/v1/users/user123/groups").mock(return_value=make_response([
+            {"profile": {"description": "Described"}},
+            {"label": "Labelled"},
+            {"type": "BUILT_IN"},
+            {"profile": {}},
+            "not-a-group"
+        ]))
         
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            groups = await _get_user_groups(
-                user_id="user123",
-                base_url="https://test.okta.com",
-                token="token123",
-                timeout=10
-            )
-            
-            assert groups == []
+        groups = await _get_user_groups(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert groups == ["Described", "Labelled", "BUILT_IN"]
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("outcome", [
+        500,
+        httpx.TimeoutException("Timeout"),
+        httpx.ConnectError("Network error"),
+    ], ids=["http-error", "timeout", "request-error"])
+    async def test_get_groups_errors_return_empty(self, okta_api, make_response, outcome):
+        """Test that HTTP errors, timeouts and network errors return empty list instead of raising."""
+        _mock_outcome(okta_api.get("/api/v1/users/user123/groups"), outcome, make_response)
+        
+        groups = await _get_user_groups(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert groups == []
+    
+    @pytest.mark.asyncio
+    async def test_get_groups_unexpected_error_returns_empty(self, make_error_client):
+        """Test that unexpected client errors return empty list."""
+        mock_client = make_error_client(RuntimeError("boom"))
+        
+        groups = await _get_user_groups(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10,
+            client=mock_client
+        )
+        
+        assert groups == []
 
 
 class TestGetUserApplications:
     """Test Okta applications retrieval."""
     
     @pytest.mark.asyncio
-    async def test_get_applications_success(self):
+    async def test_get_applications_success(self, okta_api, make_response):
         """Test successful applications retrieval."""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        okta_api.get("/api/v1/users/user123/appLinks").mock(return_value=make_response([
             {"label": "Google Workspace"},
             {"label": "Slack"},
             {"label": "Jira"}
-        ]
+        ]))
         
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        apps = await _get_user_applications(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
         
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            apps = await _get_user_applications(
-                user_id="user123",
-                base_url="https://test.okta.com",
-                token="token123",
-                timeout=10
-            )
-            
-            assert "Google Workspace" in apps
-            assert "Slack" in apps
-            assert "Jira" in apps
-            assert len(apps) == 3
+        assert "Google Workspace" in apps
+        assert "Slack" in apps
+        assert "Jira" in apps
+        assert len(apps) == 3
     
     @pytest.mark.asyncio
-    async def test_get_applications_http_error_returns_empty(self):
-        """Test that HTTP errors return empty list."""
-        mock_response = Mock()
-        mock_response.status_code = 404
-        
-        mock_client = AsyncMock()
-        mock_get = AsyncMock(side_effect=httpx.HTTPStatusError(
-            "Not found",
-            request=Mock(),
-            response=mock_response
-        ))
-        mock_client.__aenter__.return_value.get = mock_get
-        
-        with patch('httpx.AsyncClient', return_value=mock_client):
-            apps = await _get_user_applications(
-                user_id="user123",
-                base_url="https://test.okta.com",
-                token="token123",
-                timeout=10
-            )
-            
-            assert apps == []
+    @pytest.mark.parametrize("outcome", [
+        404,
+        httpx.TimeoutException("Timeout"),
+        httpx.ConnectError("Network error"),
+    ], ids=["http-error", "timeout", "request-error"])
+    async def test_get_applications_errors_return_empty(self, okta_api, make_response, outcome):
+        """Test that HTTP errors, timeouts and network errors return empty list."""
+        _mock_outcome(okta_api.get("/api/v1/users/user123/appLinks"), outcome, make_response)
+        
+        apps = await _get_user_applications(
+            user_id="user123",
+            base_url="https://test.okta.com",
+            token="token123",
+            timeout=10
+        )
+        
+        assert apps == []
 
 
 class TestLoadOktaUserByEmail:
     """Test the main load_okta_user_by_email function."""
     
     @pytest.mark.asyncio
-    async def test_load_user_success(self, sample_okta_user):
+    async def test_load_user_success(self, sample_okta_user, monkeypatch):
         """Test successful user loading with all data."""
         mock_user_data = {
             "id": "user123",
@@ -279,21 +434,196 @@ class TestLoadOktaUserByEmail:
             API_TIMEOUT_SECONDS=10
         )
         
-        with patch('app.services.okta_loader.get_settings', return_value=test_settings), \
-             patch('app.services.okta_loader._find_okta_user_by_email', return_value=mock_user_data), \
-             patch('app.services.okta_loader._get_user_groups', return_value=sample_okta_user["groups"]), \
-             patch('app.services.okta_loader._get_user_applications', return_value=sample_okta_user["applications"]):
-            
-            okta_user = await load_okta_user_by_email("test.user@example.com")
-            
-            assert okta_user is not None
-            assert isinstance(okta_user, OktaUser)
-            assert okta_user.profile.email == "test.user@example.com"
-            assert "Engineering" in okta_user.groups
-            assert "Google Workspace" in okta_user.applications
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', AsyncMock(return_value=mock_user_data))
+        monkeypatch.setattr('app.services.okta_loader._get_user_groups', AsyncMock(return_value=sample_okta_user["groups"]))
+        monkeypatch.setattr('app.services.okta_loader._get_user_applications', AsyncMock(return_value=sample_okta_user["applications"]))
+        
+        okta_user = await load_okta_user_by_email("test.user@example.com")
+        
+        assert okta_user is not None
+        assert isinstance(okta_user, OktaUser)
+        assert okta_user.profile.email == "test.user@example.com"
+        assert "Engineering" in okta_user.groups
+        assert "Google Workspace" in okta_user.applications
+    
+    @pytest.mark.asyncio
+    async def test_load_user_end_to_end(self, okta_api, sample_okta_user, make_response, monkeypatch):
+        """Test loading a user through the real HTTP path with only the Okta API stubbed."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        okta_api.get("/api/v1/users").mock(return_value=make_response([
+            {"id": "user123", "profile": sample_okta_user["profile"]}
+        ]))
+        okta_api.get("/api/v1/users/user123/groups").mock(return_value=make_response([
+            {"profile": {"name": name}} for name in sample_okta_user["groups"]
+        ]))
+        okta_api.get("/api/v1/users/user123/appLinks").mock(return_value=make_response([
+            {"label": label} for label in sample_okta_user["applications"]
+        ]))
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        
+        okta_user = await load_okta_user_by_email("test.user@example.com")
+        
+        assert okta_user.profile.email == "test.user@example.com"
+        assert okta_user.groups == sample_okta_user["groups"]
+        assert okta_user.applications == sample_okta_user["applications"]
+        assert len(okta_api.calls) == 3
+    
+    @pytest.mark.asyncio
+    async def test_load_user_uses_embedded_groups(self, okta_api, sample_okta_user, make_response, monkeypatch):
+        """Test that groups embedded in the search response skip the groups request."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        okta_api.get("/api/v1/users").mock(return_value=make_response([{
+            "id": "user123",
+            "profile": sample_okta_user["profile"],
+            "_embedded": {"groups": [{"profile": {"name": name}} for name in sample_okta_user["groups"]]},
+        }]))
+        groups_route = okta_api.get("/api/v1/users/user123/groups")
+        okta_api.get("/api/v1/users/user123/appLinks").mock(return_value=make_response([
+            {"label": label} for label in sample_okta_user["applications"]
+        ]))
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        
+        okta_user = await load_okta_user_by_email("test.user@example.com")
+        
+        assert okta_user.groups == sample_okta_user["groups"]
+        assert okta_user.applications == sample_okta_user["applications"]
+        assert not groups_route.called
+        assert len(okta_api.calls) == 2
     
     @pytest.mark.asyncio
-    async def test_load_user_not_found(self):
+    async def test_load_user_fetches_groups_and_apps_concurrently(self, sample_okta_user, monkeypatch):
+        """Test that groups and applications are fetched in parallel."""
+        mock_user_data = {
+            "id": "user123",
+            "profile": sample_okta_user["profile"]
+        }
+        
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        
+        async def slow_groups(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return sample_okta_user["groups"]
+        
+        async def slow_apps(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return sample_okta_user["applications"]
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', AsyncMock(return_value=mock_user_data))
+        monkeypatch.setattr('app.services.okta_loader._get_user_groups', AsyncMock(side_effect=slow_groups))
+        monkeypatch.setattr('app.services.okta_loader._get_user_applications', AsyncMock(side_effect=slow_apps))
+        
+        start = time.perf_counter()
+        okta_user = await load_okta_user_by_email("test.user@example.com")
+        elapsed = time.perf_counter() - start
+        
+        # Sequential calls would take ~0.4s
+        assert elapsed < 0.35
+        assert okta_user.groups == sample_okta_user["groups"]
+        assert okta_user.applications == sample_okta_user["applications"]
+    
+    @pytest.mark.asyncio
+    async def test_load_user_respects_concurrency_limit(self, sample_okta_user, make_response, monkeypatch):
+        """Test that concurrent loads never exceed the configured in-flight Okta request limit."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10,
+            OKTA_MAX_CONCURRENCY=5
+        )
+        in_flight = 0
+        max_in_flight = 0
+        
+        def tracked(payload):
+            async def _respond(request):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return make_response(payload)
+            return _respond
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        
+        with respx.mock(base_url="https://test.okta.com") as okta_api:
+            okta_api.get("/api/v1/users").mock(
+                side_effect=tracked([{"id": "user123", "profile": sample_okta_user["profile"]}])
+            )
+            okta_api.get("/api/v1/users/user123/groups").mock(side_effect=tracked([]))
+            okta_api.get("/api/v1/users/user123/appLinks").mock(side_effect=tracked([]))
+        
+            users = await asyncio.gather(*(
+                load_okta_user_by_email(f"test.user{i}@example.com") for i in range(50)
+            ))
+        
+        assert len(users) == 50
+        assert max_in_flight == 5
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_concurrent_loads_share_one_fetch(self, sample_okta_user, monkeypatch):
+        """Test that concurrent loads of one email share a single Okta fetch."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        find_user = AsyncMock(return_value={"id": "user123", "profile": sample_okta_user["profile"]})
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', find_user)
+        monkeypatch.setattr('app.services.okta_loader._get_user_groups', AsyncMock(return_value=[]))
+        monkeypatch.setattr('app.services.okta_loader._get_user_applications', AsyncMock(return_value=[]))
+        
+        users = await asyncio.gather(*[load_okta_user_by_email("test.user@example.com")] * 10)
+        cached = await load_okta_user_by_email("test.user@example.com")
+        
+        find_user.assert_awaited_once()
+        assert all(user is users[0] for user in users)
+        assert cached is users[0]
+    
+    @pytest.mark.asyncio
+    async def test_failed_load_is_not_cached(self, sample_okta_user, monkeypatch):
+        """Test that a failed load is retried on the next call instead of cached."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        find_user = AsyncMock(side_effect=[
+            OktaAPIError("Okta unavailable"),
+            {"id": "user123", "profile": sample_okta_user["profile"]},
+        ])
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', find_user)
+        monkeypatch.setattr('app.services.okta_loader._get_user_groups', AsyncMock(return_value=[]))
+        monkeypatch.setattr('app.services.okta_loader._get_user_applications', AsyncMock(return_value=[]))
+        
+        with pytest.raises(OktaAPIError):
+            await load_okta_user_by_email("test.user@example.com")
+        okta_user = await load_okta_user_by_email("test.user@example.com")
+        
+        assert okta_user.profile.email == "test.user@example.com"
+        assert find_user.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_load_user_not_found(self, monkeypatch):
         """Test loading when user is not found in Okta."""
         test_settings = Settings(
             OKTA_ORG_URL="https://test.okta.com",
@@ -301,14 +631,33 @@ class TestLoadOktaUserByEmail:
             API_TIMEOUT_SECONDS=10
         )
         
-        with patch('app.services.okta_loader.get_settings', return_value=test_settings), \
-             patch('app.services.okta_loader._find_okta_user_by_email', return_value=None):
-            
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', AsyncMock(return_value=None))
+        
+        with pytest.raises(OktaUserNotFoundError):
+            await load_okta_user_by_email("notfound@example.com")
+    
+    @pytest.mark.asyncio
+    async def test_load_user_not_found_is_cached(self, monkeypatch):
+        """Test that a repeat lookup of an unknown email does not query Okta again."""
+        test_settings = Settings(
+            OKTA_ORG_URL="https://test.okta.com",
+            OKTA_API_TOKEN="token123",
+            API_TIMEOUT_SECONDS=10
+        )
+        find_user = AsyncMock(return_value=None)
+        
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', find_user)
+        
+        for _ in range(3):
             with pytest.raises(OktaUserNotFoundError):
                 await load_okta_user_by_email("notfound@example.com")
+        
+        find_user.assert_awaited_once()
     
     @pytest.mark.asyncio
-    async def test_load_user_invalid_structure(self):
+    async def test_load_user_invalid_structure(self, monkeypatch):
         """Test loading when user data structure is invalid."""
         mock_user_data = {
             "id": "user123",
@@ -321,15 +670,15 @@ class TestLoadOktaUserByEmail:
             API_TIMEOUT_SECONDS=10
         )
         
-        with patch('app.services.okta_loader.get_settings', return_value=test_settings), \
-             patch('app.services.okta_loader._find_okta_user_by_email', return_value=mock_user_data):
-            
-            # Profile=None becomes {}, which fails Pydantic validation later
-            with pytest.raises(OktaAPIError, match="Failed to validate Okta user data"):
-                await load_okta_user_by_email("test@example.com")
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', AsyncMock(return_value=mock_user_data))
+        
+        # Profile=None becomes {}, which fails Pydantic validation later
+        with pytest.raises(OktaAPIError, match="Failed to validate Okta user data"):
+            await load_okta_user_by_email("test@example.com")
     
     @pytest.mark.asyncio
-    async def test_load_user_missing_user_id(self):
+    async def test_load_user_missing_user_id(self, monkeypatch):
         """Test loading when user ID is missing."""
         mock_user_data = {
             "profile": {"email": "test@example.com"}
@@ -342,15 +691,16 @@ class TestLoadOktaUserByEmail:
             API_TIMEOUT_SECONDS=10
         )
         
-        with patch('app.services.okta_loader.get_settings', return_value=test_settings), \
-             patch('app.services.okta_loader._find_okta_user_by_email', return_value=mock_user_data):
-            
-            with pytest.raises(OktaAPIError, match="Invalid Okta user data structure"):
-                await load_okta_user_by_email("test@example.com")
+        monkeypatch.setattr('app.services.okta_loader.get_settings', lambda: test_settings)
+        monkeypatch.setattr('app.services.okta_loader._find_okta_user_by_email', AsyncMock(return_value=mock_user_data))
+        
+        with pytest.raises(OktaAPIError, match="Invalid Okta user data structure"):
+            await load_okta_user_by_email("test@example.com")
     
     @pytest.mark.asyncio
-    async def test_load_user_config_error(self):
+    async def test_load_user_config_error(self, monkeypatch):
         """Test that configuration errors are handled properly."""
-        with patch('app.services.okta_loader.get_settings', side_effect=Exception("Config error")):
-            with pytest.raises(OktaConfigurationError, match="Okta configuration error"):
-                await load_okta_user_by_email("test@example.com")
+        monkeypatch.setattr('app.services.okta_loader.get_settings', Mock(side_effect=Exception("Config error")))
+        
+        with pytest.raises(OktaConfigurationError, match="Okta configuration error"):
+            await load_okta_user_by_email("test@example.com")
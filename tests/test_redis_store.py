@@ -5,6 +5,7 @@ Tests for the Redis user store.
 import pytest
 from unittest.mock import MagicMock, patch
 import json
+import redis
 
 from app.store import RedisUserStore
 from app.schemas import EnrichedUser
@@ -13,26 +14,15 @@ from app.schemas import EnrichedUser
 class TestRedisUserStore:
     """Test the RedisUserStore functionality."""
     
-    def test_put_and_get_user(self, redis_user_store, mock_redis_client):
+    def test_put_and_get_user(self, redis_user_store, mock_redis_client, user_jane):
         """Test storing and retrieving a user."""
-        # Create a test user
-        user = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering",
-            startDate="2024-01-15",
-            groups=["Engineering"],
-            applications=["Slack"],
-            onboarded=True
-        )
+        user = user_jane
         
         # Store the user
         redis_user_store.put(user.id, user)
         
         # Verify Redis set was called with correct key and JSON value
-        expected_key = "test:12345"
+        expected_key = b"test:12345"
         mock_redis_client.set.assert_called_once()
         call_args = mock_redis_client.set.call_args
         assert call_args[0][0] == expected_key
@@ -64,26 +54,11 @@ class TestRedisUserStore:
         retrieved_user = redis_user_store.get("nonexistent")
         
         assert retrieved_user is None
-        mock_redis_client.get.assert_called_with("test:nonexistent")
+        mock_redis_client.get.assert_called_with(b"test:nonexistent")
     
-    def test_put_multiple_users(self, redis_user_store, mock_redis_client):
+    def test_put_multiple_users(self, redis_user_store, mock_redis_client, user_jane, user_john):
         """Test storing multiple users."""
-        # Create multiple users
-        user1 = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering"
-        )
-        
-        user2 = EnrichedUser(
-            id="67890",
-            name="John Smith",
-            email="john.smith@example.com",
-            title="Product Manager",
-            department="Product"
-        )
+        user1, user2 = user_jane, user_john
         
         # Store both users
         redis_user_store.put(user1.id, user1)
@@ -108,25 +83,16 @@ class TestRedisUserStore:
         assert retrieved_user2.id == user2.id
         assert retrieved_user2.name == user2.name
     
-    def test_overwrite_existing_user(self, redis_user_store, mock_redis_client):
+    def test_overwrite_existing_user(self, redis_user_store, mock_redis_client, user_jane):
         """Test overwriting an existing user."""
-        # Create initial user
-        user1 = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering"
-        )
+        user1 = user_jane
         
-        # Create updated user with same ID
-        user2 = EnrichedUser(
-            id="12345",
-            name="Jane Doe Updated",
-            email="jane.doe.updated@example.com",
-            title="Senior Software Engineer",
-            department="Engineering"
-        )
+        # Updated user with same ID
+        user2 = user1.model_copy(update={
+            "name": "Jane Doe Updated",
+            "email": "jane.doe.updated@example.com",
+            "title": "Senior Software Engineer"
+        })
         
         # Store initial user
         redis_user_store.put(user1.id, user1)
@@ -147,14 +113,9 @@ class TestRedisUserStore:
         assert retrieved.title == "Senior Software Engineer"
         assert retrieved.email == "jane.doe.updated@example.com"
     
-    def test_store_with_minimal_user_data(self, redis_user_store, mock_redis_client):
+    def test_store_with_minimal_user_data(self, redis_user_store, mock_redis_client, minimal_user):
         """Test storing a user with minimal required data."""
-        # Create user with only required fields
-        user = EnrichedUser(
-            id="12345",
-            name="Minimal User",
-            email="minimal@example.com"
-        )
+        user = minimal_user
         
         redis_user_store.put(user.id, user)
         
@@ -173,19 +134,9 @@ class TestRedisUserStore:
         assert retrieved_user.applications == []
         assert retrieved_user.onboarded is True  # Default value
     
-    def test_store_with_complex_data(self, redis_user_store, mock_redis_client):
+    def test_store_with_complex_data(self, redis_user_store, mock_redis_client, complex_user):
         """Test storing a user with complex groups and applications data."""
-        user = EnrichedUser(
-            id="12345",
-            name="Complex User",
-            email="complex@example.com",
-            title="Full Stack Developer",
-            department="Engineering",
-            startDate="2024-01-15",
-            groups=["Engineering", "Full-Time Employees", "Stockholm Office", "Senior Developers"],
-            applications=["Google Workspace", "Slack", "Jira", "GitHub", "VS Code"],
-            onboarded=True
-        )
+        user = complex_user
         
         redis_user_store.put(user.id, user)
         
@@ -198,7 +149,171 @@ class TestRedisUserStore:
         assert "Senior Developers" in retrieved_user.groups
         assert len(retrieved_user.applications) == 5
         assert "VS Code" in retrieved_user.applications
-
+    
+    def test_put_many_uses_single_pipeline(self, redis_user_store, mock_redis_client):
+        """Test that bulk puts are sent in one pipeline round-trip."""
+        users = {
+            str(i): EnrichedUser(id=str(i), name=f"User {i}", email=f"user{i}@example.com")
+            for i in range(25)
+        }
+        
+        redis_user_store.put_many(users)
+        
+        mock_redis_client.pipeline.assert_called_once_with(transaction=False)
+        pipe = mock_redis_client.pipeline.return_value.__enter__.return_value
+        assert pipe.set.call_count == 25
+        assert pipe.set.call_args_list[0][0][0] == b"test:0"
+        pipe.execute.assert_called_once()
+        mock_redis_client.set.assert_not_called()
+    
+    def test_get_many_uses_single_mget(self, redis_user_store, mock_redis_client):
+        """Test that bulk gets use one MGET and preserve order, with None for missing users."""
+        user1 = EnrichedUser(id="1", name="User One", email="one@example.com")
+        user2 = EnrichedUser(id="2", name="User Two", email="two@example.com")
+        mock_redis_client.mget.return_value = [user1.model_dump_json(), None, user2.model_dump_json()]
+        
+        users = redis_user_store.get_many(["1", "missing", "2"])
+        
+        mock_redis_client.mget.assert_called_once_with([b"test:1", b"test:missing", b"test:2"])
+        mock_redis_client.get.assert_not_called()
+        assert users[0] == user1
+        assert users[1] is None
+        assert users[2] == user2
+    
+    def test_get_many_empty(self, redis_user_store, mock_redis_client):
+        """Test that an empty bulk get does not hit Redis."""
+        assert redis_user_store.get_many([]) == []
+        mock_redis_client.mget.assert_not_called()
+    
+    def test_get_hits_local_cache(self, cached_redis_user_store, mock_redis_client):
+        """Test that a second get for the same user is served without Redis."""
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user.model_dump_json()
+        
+        first = cached_redis_user_store.get(user.id)
+        second = cached_redis_user_store.get(user.id)
+        
+        assert first == user
+        assert second == user
+        mock_redis_client.get.assert_called_once_with(b"test:12345")
+    
+    def test_get_does_not_cache_misses(self, cached_redis_user_store, mock_redis_client):
+        """Test that a user missing from Redis is looked up again on the next get."""
+        mock_redis_client.get.return_value = None
+        
+        cached_redis_user_store.get("12345")
+        cached_redis_user_store.get("12345")
+        
+        assert mock_redis_client.get.call_count == 2
+    
+    def test_put_invalidates_local_cache(self, cached_redis_user_store, mock_redis_client):
+        """Test that writing a user drops its cached copy."""
+        user1 = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        user2 = EnrichedUser(id="12345", name="Jane Doe Updated", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user1.model_dump_json()
+        cached_redis_user_store.get(user1.id)
+        
+        cached_redis_user_store.put(user2.id, user2)
+        mock_redis_client.get.return_value = user2.model_dump_json()
+        
+        assert cached_redis_user_store.get(user2.id).name == "Jane Doe Updated"
+        assert mock_redis_client.get.call_count == 2
+    
+    def test_put_invalidates_after_write(self, cached_redis_user_store, mock_redis_client):
+        """Test that a get racing a put cannot leave the old user cached."""
+        user1 = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        user2 = EnrichedUser(id="12345", name="Jane Doe Updated", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user1.model_dump_json()
+        
+        def set_racing_get(key, value):
+            # A concurrent reader caches the old value before the SET lands
+            cached_redis_user_store.get(user1.id)
+            mock_redis_client.get.return_value = user2.model_dump_json()
+        mock_redis_client.set.side_effect = set_racing_get
+        
+        cached_redis_user_store.put(user2.id, user2)
+        
+        assert cached_redis_user_store.get(user2.id).name == "Jane Doe Updated"
+    
+    def test_get_many_serves_cached_users_locally(self, cached_redis_user_store, mock_redis_client):
+        """Test that bulk gets only MGET the users not already cached."""
+        user1 = EnrichedUser(id="1", name="User One", email="one@example.com")
+        user2 = EnrichedUser(id="2", name="User Two", email="two@example.com")
+        mock_redis_client.get.return_value = user1.model_dump_json()
+        cached_redis_user_store.get("1")
+        mock_redis_client.mget.return_value = [user2.model_dump_json()]
+        
+        users = cached_redis_user_store.get_many(["1", "2"])
+        
+        mock_redis_client.mget.assert_called_once_with([b"test:2"])
+        assert users == [user1, user2]
+    
+    def test_local_cache_disabled(self, mock_redis_client):
+        """Test that a zero-sized local cache always reads from Redis."""
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user.model_dump_json()
+        with patch('redis.Redis', return_value=mock_redis_client):
+            store = RedisUserStore(key_prefix="test:", local_cache_size=0)
+        
+        store.get(user.id)
+        store.get(user.id)
+        
+        assert mock_redis_client.get.call_count == 2
+    
+    def test_get_uses_model_construct_when_trusted(self, mock_redis_client):
+        """Test that trusted stores skip validation for records matching the schema."""
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com", groups=["Eng"])
+        mock_redis_client.get.return_value = user.model_dump_json().encode()
+        with patch('redis.Redis', return_value=mock_redis_client):
+            store = RedisUserStore(key_prefix="test:", trust_stored=True)
+        
+        with patch.object(EnrichedUser, 'model_validate') as mock_validate, \
+             patch.object(EnrichedUser, 'model_validate_json') as mock_validate_json:
+            retrieved = store.get(user.id)
+        
+        mock_validate.assert_not_called()
+        mock_validate_json.assert_not_called()
+        assert retrieved == user
+    
+    def test_trusted_get_validates_records_from_older_schema(self, mock_redis_client):
+        """Test that records whose fields differ from the current schema are still validated."""
+        mock_redis_client.get.return_value = b'{"id": "12345", "name": "Jane Doe", "email": "jane.doe@example.com"}'
+        with patch('redis.Redis', return_value=mock_redis_client):
+            store = RedisUserStore(key_prefix="test:", trust_stored=True)
+        
+        retrieved = store.get("12345")
+        
+        assert retrieved.groups == []
+        assert retrieved.onboarded is True
+    
+    def test_compressed_values_round_trip(self, mock_redis_client):
+        """Test that compressed stores write zstd frames and read them back."""
+        import zstandard
+        user = EnrichedUser(
+            id="12345",
+            name="Jane Doe",
+            email="jane.doe@example.com",
+            groups=["Engineering", "Full-Time Employees"],
+            applications=["Slack", "Jira"]
+        )
+        with patch('redis.Redis', return_value=mock_redis_client):
+            store = RedisUserStore(key_prefix="test:", compress=True)
+        
+        store.put(user.id, user)
+        stored = mock_redis_client.set.call_args[0][1]
+        
+        assert json.loads(zstandard.ZstdDecompressor().decompress(stored)) == user.model_dump()
+        mock_redis_client.get.return_value = stored
+        assert store.get(user.id) == user
+    
+    def test_compressed_store_reads_plain_values(self, mock_redis_client):
+        """Test that values written before compression was enabled still load."""
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user.model_dump_json().encode()
+        with patch('redis.Redis', return_value=mock_redis_client):
+            store = RedisUserStore(key_prefix="test:", compress=True)
+        
+        assert store.get(user.id) == user
 
 class TestRedisStoreSpecificFeatures:
     """Test Redis-specific features and error handling."""
@@ -215,11 +330,16 @@ class TestRedisStoreSpecificFeatures:
             
             # Verify Redis client was created with correct parameters
             mock_redis_class.assert_called_once()
-            call_kwargs = mock_redis_class.call_args.kwargs
+            call_kwargs = mock_redis_class.call_args.kwargs['connection_pool'].connection_kwargs
             assert call_kwargs['host'] == "localhost"
             assert call_kwargs['port'] == 6379
             assert call_kwargs['db'] == 0
-            assert call_kwargs['decode_responses'] is True
+            assert call_kwargs['decode_responses'] is False
+            assert call_kwargs['health_check_interval'] == 30
+            pool = mock_redis_class.call_args.kwargs['connection_pool']
+            assert isinstance(pool, redis.BlockingConnectionPool)
+            assert pool.max_connections == 50
+            assert pool.timeout == 5
             
             # Verify ping was called to test connection
             mock_redis_client.ping.assert_called_once()
@@ -253,25 +373,17 @@ class TestRedisStoreSpecificFeatures:
         
         # Verify the key has the correct prefix
         call_args = mock_redis_client.set.call_args
-        assert call_args[0][0] == "test:test123"
+        assert call_args[0][0] == b"test:test123"
         
         # Get user
         redis_user_store.get(user.id)
         
         # Verify get also uses correct prefix
-        mock_redis_client.get.assert_called_with("test:test123")
+        mock_redis_client.get.assert_called_with(b"test:test123")
     
-    def test_serialization(self, redis_user_store, mock_redis_client):
+    def test_serialization(self, redis_user_store, mock_redis_client, complex_user):
         """Test JSON serialization and deserialization."""
-        user = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Engineer",
-            department="Engineering",
-            groups=["Team A", "Team B"],
-            applications=["App1", "App2"]
-        )
+        user = complex_user
         
         # Store user
         redis_user_store.put(user.id, user)
@@ -283,9 +395,9 @@ class TestRedisStoreSpecificFeatures:
         # Verify it's valid JSON
         stored_data = json.loads(stored_json)
         assert stored_data['id'] == "12345"
-        assert stored_data['name'] == "Jane Doe"
-        assert stored_data['email'] == "jane.doe@example.com"
-        assert stored_data['groups'] == ["Team A", "Team B"]
+        assert stored_data['name'] == "Complex User"
+        assert stored_data['email'] == "complex@example.com"
+        assert stored_data['groups'] == ["Engineering", "Full-Time Employees", "Stockholm Office", "Senior Developers"]
         
         # Mock retrieval with the same JSON
         mock_redis_client.get.return_value = stored_json
@@ -296,12 +408,52 @@ class TestRedisStoreSpecificFeatures:
         assert retrieved_user.name == user.name
         assert retrieved_user.groups == user.groups
     
+    def test_get_parses_raw_bytes_reply(self, redis_user_store, mock_redis_client):
+        """Test that undecoded byte replies from Redis are deserialized directly."""
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        mock_redis_client.get.return_value = user.model_dump_json().encode()
+        
+        assert redis_user_store.get(user.id) == user
+    
     def test_close_connection(self, redis_user_store, mock_redis_client):
         """Test closing the Redis connection."""
-        redis_user_store.close()
+        with patch.object(redis_user_store._pool, 'disconnect') as mock_disconnect:
+            redis_user_store.close()
         
         # Verify close was called on the Redis client
         mock_redis_client.close.assert_called_once()
+        mock_disconnect.assert_called_once()
+    
+    def test_cluster_mode_uses_redis_cluster(self, mock_redis_client):
+        """Test that cluster mode connects via RedisCluster with hash-tagged keys."""
+        with patch('redis.cluster.RedisCluster', return_value=mock_redis_client) as mock_cluster_class, \
+             patch('redis.Redis') as mock_redis_class:
+            store = RedisUserStore(
+                host="redis-node-1",
+                port=7000,
+                key_prefix="test:",
+                max_connections=20,
+                cluster=True
+            )
+        
+        mock_redis_class.assert_not_called()
+        call_kwargs = mock_cluster_class.call_args.kwargs
+        startup_node = call_kwargs['startup_nodes'][0]
+        assert (startup_node.host, startup_node.port) == ("redis-node-1", 7000)
+        assert call_kwargs['max_connections'] == 20
+        assert call_kwargs['decode_responses'] is False
+        
+        user = EnrichedUser(id="12345", name="Jane Doe", email="jane.doe@example.com")
+        store.put(user.id, user)
+        assert mock_redis_client.set.call_args[0][0] == b"test:{12345}"
+        
+        mock_redis_client.mget_nonatomic.return_value = [None]
+        store.get_many(["67890"])
+        mock_redis_client.mget_nonatomic.assert_called_once_with([b"test:{67890}"])
+        mock_redis_client.mget.assert_not_called()
+        
+        store.close()
+        mock_redis_client.close.assert_called_once()
     
     def test_put_redis_error(self, redis_user_store, mock_redis_client):
         """Test handling of Redis errors during put operation."""
@@ -360,7 +512,7 @@ class TestRedisStoreSpecificFeatures:
             
             # Verify custom prefix is used
             call_args = mock_redis_client.set.call_args
-            assert call_args[0][0] == "custom_prefix:test123"
+            assert call_args[0][0] == b"custom_prefix:test123"
     
     def test_password_authentication(self, mock_redis_client):
         """Test Redis initialization with password."""
@@ -374,7 +526,7 @@ class TestRedisStoreSpecificFeatures:
             )
             
             # Verify password was passed to Redis client
-            call_kwargs = mock_redis_class.call_args.kwargs
+            call_kwargs = mock_redis_class.call_args.kwargs['connection_pool'].connection_kwargs
             assert call_kwargs['password'] == "secret_password"
     
     def test_custom_connection_timeout(self, mock_redis_client):
@@ -388,7 +540,7 @@ class TestRedisStoreSpecificFeatures:
             )
             
             # Verify timeout was passed to Redis client
-            call_kwargs = mock_redis_class.call_args.kwargs
+            call_kwargs = mock_redis_class.call_args.kwargs['connection_pool'].connection_kwargs
             assert call_kwargs['socket_connect_timeout'] == 10
             assert call_kwargs['socket_timeout'] == 10
     
@@ -403,6 +555,6 @@ class TestRedisStoreSpecificFeatures:
             )
             
             # Verify database number was passed
-            call_kwargs = mock_redis_class.call_args.kwargs
+            call_kwargs = mock_redis_class.call_args.kwargs['connection_pool'].connection_kwargs
             assert call_kwargs['db'] == 5
 
@@ -5,11 +5,13 @@ Tests for security utilities (PII scrubbing, webhook signatures).
 import pytest
 import hmac
 import hashlib
+from unittest.mock import patch
 
 from app.security import (
     mask_email,
     hash_identifier,
     scrub_pii,
+    scrub_pii_batch,
     generate_webhook_signature,
     verify_webhook_signature
 )
@@ -104,7 +106,7 @@ class TestHashIdentifier:
         
         # Should be 8 hexadecimal characters
         assert len(hashed) == 8
-        assert all(c in '0123456789abcdef' for c in hashed)
+        assert bytes.fromhex(hashed).hex() == hashed  # lowercase hex only
 
 
 class TestScrubPII:
@@ -229,6 +231,16 @@ class TestScrubPII:
         scrubbed = scrub_pii(data)
         
         assert scrubbed == data
+    
+    def test_scrub_batch_matches_single(self, sample_hr_user):
+        """Test that batch scrubbing gives the same result as scrubbing each record."""
+        records = [
+            sample_hr_user,
+            {"email": "john@example.com", "phone": "123", "employee_id": None},
+            {},
+        ]
+        
+        assert scrub_pii_batch(records) == [scrub_pii(record) for record in records]
 
 
 class TestWebhookSignature:
@@ -244,7 +256,7 @@ class TestWebhookSignature:
         # Should be a hex string
         assert isinstance(signature, str)
         assert len(signature) == 64  # SHA-256 produces 64 hex chars
-        assert all(c in '0123456789abcdef' for c in signature)
+        assert bytes.fromhex(signature).hex() == signature  # lowercase hex only
     
     def test_generate_signature_consistency(self):
         """Test that signature generation is deterministic."""
@@ -292,6 +304,18 @@ class TestWebhookSignature:
         
         assert verify_webhook_signature(payload, invalid_signature, secret) is False
     
+    def test_verify_wrong_length_signature_skips_hmac(self):
+        """Test that a signature of the wrong length is rejected without hashing the payload."""
+        payload = b'{"employee_id": "12345"}'
+        secret = "test-secret-key"
+        signature = generate_webhook_signature(payload, secret)
+        
+        with patch("app.security.generate_webhook_signature") as generate:
+            assert verify_webhook_signature(payload, signature[:-1], secret) is False
+            assert verify_webhook_signature(payload, signature + "0", secret) is False
+        
+        generate.assert_not_called()
+    
     def test_verify_empty_signature(self):
         """Test verifying an empty signature."""
         payload = b'{"test": "data"}'
@@ -348,4 +372,31 @@ class TestWebhookSignature:
         signature = generate_webhook_signature(payload, secret)
         
         assert verify_webhook_signature(payload, signature, secret) is True
-
+    
+    def test_blake2b_signature(self):
+        """Test keyed BLAKE2b signatures round-trip and differ from HMAC-SHA256."""
+        payload = b'{"employee_id": "12345"}'
+        secret = "test-secret-key"
+        
+        signature = generate_webhook_signature(payload, secret, algorithm="blake2b")
+        expected = hashlib.blake2b(payload, key=secret.encode(), digest_size=32).hexdigest()
+        
+        assert signature == expected
+        assert signature != generate_webhook_signature(payload, secret)
+        assert verify_webhook_signature(payload, signature, secret, algorithm="blake2b") is True
+        assert verify_webhook_signature(payload, signature, secret) is False
+    
+    def test_blake2b_signature_long_secret(self):
+        """Test that secrets longer than BLAKE2b's key limit are still accepted."""
+        payload = b'{"test": "data"}'
+        secret = "s" * 100
+        
+        signature = generate_webhook_signature(payload, secret, algorithm="blake2b")
+        
+        assert len(signature) == 64
+        assert verify_webhook_signature(payload, signature, secret, algorithm="blake2b") is True
+    
+    def test_unsupported_signature_algorithm(self):
+        """Test that an unknown algorithm is rejected."""
+        with pytest.raises(ValueError, match="Unsupported signature algorithm"):
+            generate_webhook_signature(b"{}", "test-secret", algorithm="md5")
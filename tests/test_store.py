@@ -11,22 +11,11 @@ from app.schemas import EnrichedUser
 class TestInMemoryUserStore:
     """Test the InMemoryUserStore functionality."""
     
-    def test_put_and_get_user(self):
+    def test_put_and_get_user(self, user_jane):
         """Test storing and retrieving a user."""
         store = InMemoryUserStore()
         
-        # Create a test user
-        user = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering",
-            startDate="2024-01-15",
-            groups=["Engineering"],
-            applications=["Slack"],
-            onboarded=True
-        )
+        user = user_jane
         
         # Store the user
         store.put(user.id, user)
@@ -53,26 +42,11 @@ class TestInMemoryUserStore:
         
         assert retrieved_user is None
     
-    def test_put_multiple_users(self):
+    def test_put_multiple_users(self, user_jane, user_john):
         """Test storing multiple users."""
         store = InMemoryUserStore()
         
-        # Create multiple users
-        user1 = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering"
-        )
-        
-        user2 = EnrichedUser(
-            id="67890",
-            name="John Smith",
-            email="john.smith@example.com",
-            title="Product Manager",
-            department="Product"
-        )
+        user1, user2 = user_jane, user_john
         
         # Store both users
         store.put(user1.id, user1)
@@ -90,27 +64,18 @@ class TestInMemoryUserStore:
         assert retrieved_user2.id == user2.id
         assert retrieved_user2.name == user2.name
     
-    def test_overwrite_existing_user(self):
+    def test_overwrite_existing_user(self, user_jane):
         """Test overwriting an existing user."""
         store = InMemoryUserStore()
         
-        # Create initial user
-        user1 = EnrichedUser(
-            id="12345",
-            name="Jane Doe",
-            email="jane.doe@example.com",
-            title="Software Engineer",
-            department="Engineering"
-        )
-        
-        # Create updated user with same ID
-        user2 = EnrichedUser(
-            id="12345",
-            name="Jane Doe Updated",
-            email="jane.doe.updated@example.com",
-            title="Senior Software Engineer",
-            department="Engineering"
-        )
+        user1 = user_jane
+        
+        # Updated user with same ID
+        user2 = user1.model_copy(update={
+            "name": "Jane Doe Updated",
+            "email": "jane.doe.updated@example.com",
+            "title": "Senior Software Engineer"
+        })
         
         # Store initial user
         store.put(user1.id, user1)
@@ -129,16 +94,11 @@ class TestInMemoryUserStore:
         assert retrieved.title == "Senior Software Engineer"
         assert retrieved.email == "jane.doe.updated@example.com"
     
-    def test_store_with_minimal_user_data(self):
+    def test_store_with_minimal_user_data(self, minimal_user):
         """Test storing a user with minimal required data."""
         store = InMemoryUserStore()
         
-        # Create user with only required fields
-        user = EnrichedUser(
-            id="12345",
-            name="Minimal User",
-            email="minimal@example.com"
-        )
+        user = minimal_user
         
         store.put(user.id, user)
         retrieved_user = store.get(user.id)
@@ -154,21 +114,11 @@ class TestInMemoryUserStore:
         assert retrieved_user.applications == []
         assert retrieved_user.onboarded is True  # Default value
     
-    def test_store_with_complex_data(self):
+    def test_store_with_complex_data(self, complex_user):
         """Test storing a user with complex groups and applications data."""
         store = InMemoryUserStore()
         
-        user = EnrichedUser(
-            id="12345",
-            name="Complex User",
-            email="complex@example.com",
-            title="Full Stack Developer",
-            department="Engineering",
-            startDate="2024-01-15",
-            groups=["Engineering", "Full-Time Employees", "Stockholm Office", "Senior Developers"],
-            applications=["Google Workspace", "Slack", "Jira", "GitHub", "VS Code"],
-            onboarded=True
-        )
+        user = complex_user
         
         store.put(user.id, user)
         retrieved_user = store.get(user.id)
@@ -196,3 +146,50 @@ class TestInMemoryUserStore:
         assert store1.get(user2.id) is None
         assert store2.get(user1.id) is None
         assert store2.get(user2.id) is not None
+    
+    def test_put_many_and_get_many(self):
+        """Test bulk storing and retrieving users."""
+        store = InMemoryUserStore()
+        users = {
+            "1": EnrichedUser(id="1", name="User One", email="one@example.com"),
+            "2": EnrichedUser(id="2", name="User Two", email="two@example.com"),
+        }
+        
+        store.put_many(users)
+        
+        assert store.get_many(["2", "missing", "1"]) == [users["2"], None, users["1"]]
+    
+    def test_overwrite_publishes_new_row(self, user_jane):
+        """Test that overwriting a user leaves the old row intact for in-flight readers."""
+        store = InMemoryUserStore()
+        updated = user_jane.model_copy(update={"title": "Staff Engineer"})
+        
+        store.put(user_jane.id, user_jane)
+        _, columns = store._state
+        store.put(updated.id, updated)
+        
+        assert store.get(user_jane.id) == updated
+        assert columns["title"][0] == user_jane.title
+    
+    def test_overwrites_are_compacted(self, user_jane, user_john):
+        """Test that repeated overwrites do not grow the columns without bound."""
+        store = InMemoryUserStore()
+        store.put(user_john.id, user_john)
+        
+        for i in range(50):
+            store.put(user_jane.id, user_jane.model_copy(update={"title": f"Title {i}"}))
+        
+        index, columns = store._state
+        assert len(columns["id"]) <= 2 * len(index) + 1
+        assert store.get(user_jane.id).title == "Title 49"
+        assert store.get(user_john.id) == user_john
+    
+    def test_get_field(self, user_jane):
+        """Test reading a single field without building the user."""
+        store = InMemoryUserStore()
+        store.put(user_jane.id, user_jane)
+        
+        assert store.get_field(user_jane.id, "email") == user_jane.email
+        assert store.get_field("missing", "email") is None
+        with pytest.raises(KeyError):
+            store.get_field(user_jane.id, "not_a_field")
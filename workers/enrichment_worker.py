@@ -5,73 +5,136 @@ This worker:
 1. Consumes messages from user.enrichment.requested topic
 2. Fetches Okta data with retry logic
 3. Enriches and stores user data
-4. Commits offset on success
-5. Publishes failed messages to DLQ
+4. Publishes failed messages to DLQ
+5. Commits offsets in batches once DLQ messages are delivered
 """
 
 import asyncio
-import json
 import logging
 import signal
 import sys
-from typing import Optional
-from confluent_kafka import Consumer, Producer
+import time
+import zlib
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+import orjson
+from confluent_kafka import Consumer, Producer, TopicPartition
 from confluent_kafka.error import KafkaError
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 # Add current directory to path for app module
 sys.path.insert(0, '/app')
 
 from app.schemas import HRUserIn, EnrichedUser
-from app.services.okta_loader import load_okta_user_by_email
+from app.services.okta_loader import close_okta_clients
+from app.services.okta_fetch import fetch_okta_data
 from app.dependencies import get_user_store
 from app.kafka_config import KafkaSettings, create_kafka_consumer, create_kafka_producer
-from app.exceptions import OktaUserNotFoundError, OktaConfigurationError, OktaAPIError
-from app.security import scrub_pii
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    retry_if_not_exception_type,
-    before_sleep_log,
-    after_log
+from app.exceptions import (
+    OktaUserNotFoundError,
+    OktaConfigurationError,
+    OktaAPIError,
+    OktaCircuitOpenError
 )
+from app.security import scrub_pii
+from tenacity import RetryError
 
 logger = logging.getLogger(__name__)
 
-# Graceful shutdown flag
-shutdown_requested = False
+# Longest a consume call blocks on an idle topic; shutdown waits for at most
+# one such call to return
+CONSUME_TIMEOUT_SECONDS = 5.0
+
+# Longest a DLQ flush waits for outstanding delivery reports
+DLQ_FLUSH_TIMEOUT_SECONDS = 5.0
+
+# Attempts to deliver a failed message to the DLQ before it is logged and
+# its offset committed without a DLQ copy
+DLQ_MAX_ATTEMPTS = 3
 
+_SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
 
-def signal_handler(signum, frame):
+
+def _request_shutdown(stop_event: asyncio.Event, signum: int) -> None:
     """Handle shutdown signals gracefully."""
-    global shutdown_requested
     logger.info(f"Received signal {signum}, initiating graceful shutdown...")
-    shutdown_requested = True
+    stop_event.set()
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=30),
-    retry=(
-        retry_if_exception_type((OktaAPIError, ConnectionError, TimeoutError)) &
-        retry_if_not_exception_type((OktaUserNotFoundError, OktaConfigurationError))
+def install_shutdown_handlers(loop: asyncio.AbstractEventLoop, stop_event: asyncio.Event) -> None:
+    """
+    Set stop_event on SIGINT/SIGTERM.
+    
+    Uses the event loop's signal handling where available and falls back to
+    signal.signal on platforms without it (Windows).
+    """
+    for sig in _SHUTDOWN_SIGNALS:
+        try:
+            loop.add_signal_handler(sig, _request_shutdown, stop_event, sig)
+        except NotImplementedError:
+            signal.signal(
+                sig,
+                lambda signum, frame: loop.call_soon_threadsafe(_request_shutdown, stop_event, signum)
+            )
+
+
+def remove_shutdown_handlers(loop: asyncio.AbstractEventLoop) -> None:
+    """Undo install_shutdown_handlers."""
+    for sig in _SHUTDOWN_SIGNALS:
+        try:
+            loop.remove_signal_handler(sig)
+        except NotImplementedError:
+            signal.signal(sig, signal.SIG_DFL)
+
+
+# Known enrichment failures: exception type -> (log message, builder for the
+# error recorded on the DLQ message from the exception and email)
+_FAILURE_HANDLERS: Dict[type, Tuple[str, Callable[[BaseException, Optional[str]], str]]] = {
+    OktaUserNotFoundError: (
+        "Enrichment failed: User not found (permanent error)",
+        lambda exc, email: f"Okta user not found: {email}"
     ),
-    before_sleep=before_sleep_log(logger, logging.WARNING),
-    after=after_log(logger, logging.INFO)
-)
-async def fetch_okta_data_with_retry(email: str):
-    """Fetch Okta user data with automatic retry on transient failures."""
-    return await load_okta_user_by_email(email)
+    OktaConfigurationError: (
+        "Enrichment failed: Configuration error (permanent error)",
+        lambda exc, email: f"Okta configuration error: {str(exc)}"
+    ),
+    OktaCircuitOpenError: (
+        "Enrichment skipped: Okta circuit breaker open",
+        lambda exc, email: f"Okta unavailable: {str(exc)}"
+    ),
+    OktaAPIError: (
+        "Enrichment failed: API error after all retries",
+        lambda exc, email: f"Okta API error after retries: {str(exc)}"
+    ),
+}
+
 
+def _failure_handler(exc: BaseException) -> Optional[Tuple[str, Callable[[BaseException, Optional[str]], str]]]:
+    """Find the handler for an exception, most specific class first."""
+    for cls in type(exc).__mro__:
+        handler = _FAILURE_HANDLERS.get(cls)
+        if handler is not None:
+            return handler
+    return None
 
-async def process_enrichment_message(message_value: dict, store) -> tuple[bool, Optional[str]]:
+
+async def process_enrichment_message(
+    message_value: dict,
+    store,
+    trust_schema: bool = False
+) -> tuple[bool, Optional[str]]:
     """
     Process a single enrichment message.
     
     Args:
         message_value: Deserialized message from Kafka
         store: User store instance
+        trust_schema: Skip re-validating the HR payload (the producer already
+            built it from a validated HRUserIn)
         
     Returns:
         Tuple of (success: bool, error_message: Optional[str])
@@ -79,132 +142,105 @@ async def process_enrichment_message(message_value: dict, store) -> tuple[bool,
     employee_id = message_value.get("employee_id")
     email = message_value.get("email")
     correlation_id = message_value.get("correlation_id")
+    # Shared by the request log and every failure log below
+    log_fields = {
+        "employee_id": employee_id,
+        "email": email,
+        "correlation_id": correlation_id
+    }
     
-    logger.info(
-        "Processing enrichment request",
-        extra=scrub_pii({
-            "employee_id": employee_id,
-            "email": email,
-            "correlation_id": correlation_id
-        })
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Processing enrichment request",
+            extra=scrub_pii(log_fields)
+        )
     
     try:
         # Reconstruct HRUserIn from message
-        hr_user = HRUserIn(**message_value)
+        if trust_schema:
+            hr_user = HRUserIn.model_construct(**message_value)
+        else:
+            hr_user = HRUserIn(**message_value)
         
-        # Fetch Okta data with retry
-        okta_data = await fetch_okta_data_with_retry(email)
+        # Fetch Okta data with retry, failing fast while the breaker is open
+        okta_data = await fetch_okta_data(email)
         
         # Merge HR and Okta data
         enriched = EnrichedUser.from_sources(hr=hr_user, okta=okta_data)
         
-        # Store enriched user
-        store.put(enriched.id, enriched)
+        # Store enriched user; the store client is blocking, so keep it off
+        # the event loop the other workers share
+        await asyncio.to_thread(store.put, enriched.id, enriched)
         
-        logger.info(
-            "Successfully completed enrichment",
-            extra=scrub_pii({
-                "employee_id": employee_id,
-                "user_id": enriched.id,
-                "email": enriched.email,
-                "groups_count": len(enriched.groups),
-                "apps_count": len(enriched.applications),
-                "correlation_id": correlation_id
-            })
-        )
+        # Employee ID and email are already on the request log above; these
+        # extras carry no PII so they skip scrubbing
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Successfully completed enrichment",
+                extra={
+                    "user_id": enriched.id,
+                    "groups_count": len(enriched.groups),
+                    "apps_count": len(enriched.applications),
+                    "correlation_id": correlation_id
+                }
+            )
         
         return True, None
         
-    except OktaUserNotFoundError as e:
-        error_msg = f"Okta user not found: {email}"
-        logger.error(
-            "Enrichment failed: User not found (permanent error)",
-            extra=scrub_pii({
-                "employee_id": employee_id,
-                "email": email,
-                "error": str(e),
-                "correlation_id": correlation_id
-            })
-        )
-        return False, error_msg
-        
-    except OktaConfigurationError as e:
-        error_msg = f"Okta configuration error: {str(e)}"
-        logger.error(
-            "Enrichment failed: Configuration error (permanent error)",
-            extra=scrub_pii({
-                "employee_id": employee_id,
-                "error": str(e),
-                "correlation_id": correlation_id
-            })
-        )
-        return False, error_msg
-        
-    except OktaAPIError as e:
-        error_msg = f"Okta API error after retries: {str(e)}"
-        logger.error(
-            "Enrichment failed: API error after all retries",
-            extra=scrub_pii({
-                "employee_id": employee_id,
-                "email": email,
-                "error": str(e),
-                "correlation_id": correlation_id
-            })
-        )
-        return False, error_msg
-        
     except Exception as e:
-        # Check if this is a RetryError from tenacity
-        from tenacity import RetryError
-        if isinstance(e, RetryError):
-            # Extract the original exception from RetryError
-            original_error = getattr(e, 'last_attempt', None)
-            if original_error and hasattr(original_error, 'exception'):
-                original_exception = original_error.exception()
-                if isinstance(original_exception, OktaAPIError):
-                    error_msg = f"Okta API error after retries: {str(original_exception)}"
-                    logger.error(
-                        "Enrichment failed: API error after all retries",
-                        extra=scrub_pii({
-                            "employee_id": employee_id,
-                            "email": email,
-                            "error": str(original_exception),
-                            "correlation_id": correlation_id
-                        })
-                    )
-                    return False, error_msg
+        exc = e
+        # Report the Okta error behind an exhausted retry, not the RetryError
+        if isinstance(exc, RetryError):
+            original_exception = exc.last_attempt.exception()
+            if isinstance(original_exception, OktaAPIError):
+                exc = original_exception
         
-        error_msg = f"Unexpected error: {str(e)}"
-        logger.error(
-            "Enrichment failed: Unexpected error",
-            extra=scrub_pii({
-                "employee_id": employee_id,
-                "email": email,
-                "error": str(e),
-                "correlation_id": correlation_id
-            }),
-            exc_info=True
-        )
-        return False, error_msg
+        handler = _failure_handler(exc)
+        if handler is None:
+            logger.error(
+                "Enrichment failed: Unexpected error",
+                extra=scrub_pii({**log_fields, "error": str(exc)}),
+                exc_info=True
+            )
+            return False, f"Unexpected error: {str(exc)}"
+        
+        log_message, describe = handler
+        logger.error(log_message, extra=scrub_pii({**log_fields, "error": str(exc)}))
+        return False, describe(exc, email)
 
 
-async def publish_to_dlq(producer: Producer, dlq_topic: str, original_message: dict, error: str):
-    """Publish failed message to dead letter queue."""
+def produce_dlq_message(
+    producer: Producer,
+    dlq_topic: str,
+    original_message: dict,
+    error: str,
+    source_topic: str = "user.enrichment.requested",
+    on_delivery: Optional[Callable] = None
+) -> bool:
+    """
+    Queue a failed message on the dead letter queue.
+    
+    Returns:
+        True if the message was queued; on_delivery reports whether the
+        broker actually accepted it
+    """
     try:
         dlq_message = {
             **original_message,
             "error": error,
-            "original_topic": "user.enrichment.requested",
-            "failed_at": str(asyncio.get_event_loop().time())
+            "original_topic": source_topic,
+            "failed_at": time.time()
         }
         
         producer.produce(
             topic=dlq_topic,
             key=original_message.get("employee_id").encode('utf-8') if original_message.get("employee_id") else None,
-            value=json.dumps(dlq_message).encode('utf-8')
+            value=orjson.dumps(dlq_message),
+            on_delivery=on_delivery
         )
-        producer.flush(timeout=5)
+        # Serve delivery reports without blocking; the rest are served by the
+        # flush before the next offset commit
+        producer.poll(0)
         
         logger.info(
             "Published failed message to DLQ",
@@ -216,13 +252,274 @@ async def publish_to_dlq(producer: Producer, dlq_topic: str, original_message: d
         )
     except Exception as e:
         logger.error(f"Failed to publish to DLQ: {e}")
+        return False
+    return True
+
+
+async def publish_to_dlq(
+    producer: Producer,
+    dlq_topic: str,
+    original_message: dict,
+    error: str,
+    source_topic: str = "user.enrichment.requested",
+    on_delivery: Optional[Callable] = None
+) -> bool:
+    """Publish failed message to dead letter queue (see produce_dlq_message)."""
+    return produce_dlq_message(producer, dlq_topic, original_message, error, source_topic, on_delivery)
+
+
+class DlqPublisher:
+    """
+    Move failed messages to the DLQ and finish their offsets once delivered.
+    
+    Delivery reports are served on whichever thread polls or flushes the
+    producer, so each report is handed back to the event loop. A failed
+    produce or delivery is retried up to max_attempts times; after that the
+    message is logged and its offset finished anyway, so one lost DLQ copy
+    cannot hold back commits on its partition indefinitely.
+    """
+    
+    def __init__(
+        self,
+        producer: Producer,
+        dlq_topic: str,
+        source_topic: str,
+        loop: asyncio.AbstractEventLoop,
+        on_done: Callable[[Any], None],
+        max_attempts: int = DLQ_MAX_ATTEMPTS
+    ):
+        self._producer = producer
+        self._dlq_topic = dlq_topic
+        self._source_topic = source_topic
+        self._loop = loop
+        self._on_done = on_done
+        self._max_attempts = max_attempts
+    
+    def publish(self, msg, message_value: dict, error: str, attempt: int = 1) -> bool:
+        """
+        Queue message_value on the DLQ on behalf of the consumed msg.
+        
+        Returns:
+            Whether this attempt was queued; on_done is called for msg once a
+            copy is delivered or the attempts run out
+        """
+        def on_delivery(err, _dlq_msg) -> None:
+            self._loop.call_soon_threadsafe(self._on_result, msg, message_value, error, attempt, err)
+        
+        queued = produce_dlq_message(
+            self._producer,
+            self._dlq_topic,
+            message_value,
+            error,
+            self._source_topic,
+            on_delivery=on_delivery
+        )
+        if not queued:
+            self._on_result(msg, message_value, error, attempt, "produce failed")
+        return queued
+    
+    def _on_result(self, msg, message_value: dict, error: str, attempt: int, err) -> None:
+        if err is None:
+            self._on_done(msg)
+            return
+        
+        location = f"offset {msg.offset()} on {msg.topic()}[{msg.partition()}]"
+        if attempt < self._max_attempts:
+            logger.warning(f"DLQ delivery attempt {attempt} failed for {location}, retrying: {err}")
+            self.publish(msg, message_value, error, attempt + 1)
+            return
+        
+        logger.error(
+            f"Giving up on DLQ delivery for {location} after {attempt} attempts: {err}",
+            extra=scrub_pii({
+                "employee_id": message_value.get("employee_id"),
+                "email": message_value.get("email"),
+                "error": error
+            })
+        )
+        self._on_done(msg)
+
+
+async def decode_and_process(
+    msg,
+    store,
+    trust_schema: bool = False
+) -> tuple[Optional[dict], bool, Optional[str]]:
+    """
+    Decode a Kafka message and run enrichment on it.
+    
+    Returns:
+        Tuple of (message_value, success, error_message); message_value is
+        None when the message could not be decoded or processed
+    """
+    try:
+        message_value = orjson.loads(msg.value())
+        success, error = await process_enrichment_message(message_value, store, trust_schema)
+    except Exception as e:
+        logger.error(f"Error processing message: {e}", exc_info=True)
+        return None, False, str(e)
+    
+    return message_value, success, error
+
+
+class OffsetTracker:
+    """
+    Track consumed offsets per partition so commits never pass an unfinished message.
+    
+    Messages are registered with start() in consumption order and may finish in
+    any order; an offset only becomes committable once every earlier offset in
+    its partition has finished.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, int], Deque[int]] = defaultdict(deque)
+        self._finished: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+        # Next offset to consume per (topic, partition), ready to commit
+        self.pending: Dict[Tuple[str, int], int] = {}
+        self.pending_count = 0
+    
+    def start(self, msg) -> None:
+        """Register a consumed message before it is handed to a worker."""
+        self._inflight[(msg.topic(), msg.partition())].append(msg.offset())
+    
+    def finish(self, msg) -> None:
+        """Mark a message as processed and advance its partition's committable offset."""
+        key = (msg.topic(), msg.partition())
+        inflight = self._inflight[key]
+        finished = self._finished[key]
+        finished.add(msg.offset())
+        
+        while inflight and inflight[0] in finished:
+            offset = inflight.popleft()
+            finished.discard(offset)
+            self.pending[key] = offset + 1
+        
+        self.pending_count += 1
+
+
+async def commit_offsets(
+    kafka_consumer: Consumer,
+    dlq_producer: Producer,
+    pending_offsets: Dict[Tuple[str, int], int],
+    asynchronous: bool = True
+) -> None:
+    """
+    Commit buffered offsets in one request.
+    
+    The DLQ producer is flushed first so outstanding delivery reports finish
+    their offsets; if any DLQ message is still undelivered after the timeout
+    the commit is skipped and the offsets wait for the next one.
+    
+    Args:
+        kafka_consumer: Consumer to commit on
+        dlq_producer: Producer holding queued DLQ messages
+        pending_offsets: Next offset to consume per (topic, partition); cleared
+            once committed
+        asynchronous: Whether to return without waiting for the broker
+    """
+    undelivered = await asyncio.to_thread(dlq_producer.flush, DLQ_FLUSH_TIMEOUT_SECONDS)
+    if undelivered:
+        logger.warning(f"Skipping offset commit: {undelivered} DLQ messages still undelivered")
+        return
+    
+    if not pending_offsets:
+        return
+    
+    offsets = [
+        TopicPartition(topic, partition, offset)
+        for (topic, partition), offset in pending_offsets.items()
+    ]
+    pending_offsets.clear()
+    
+    kafka_consumer.commit(offsets=offsets, asynchronous=asynchronous)
+    logger.debug("Committed offsets for %d partitions", len(offsets))
 
 
-async def run_consumer():
+def worker_index(msg, worker_count: int) -> int:
+    """
+    Pick the worker queue for a message.
+    
+    Messages with the same key (the employee ID), or unkeyed messages from
+    the same partition, always go to the same worker, so they are enriched
+    one at a time in the order they were consumed.
+    """
+    key = msg.key()
+    if key is None:
+        return msg.partition() % worker_count
+    return zlib.crc32(key) % worker_count
+
+
+async def enrich_from_queue(
+    queue: asyncio.Queue,
+    tracker: OffsetTracker,
+    commit_due: asyncio.Event,
+    store,
+    dlq_producer: Producer,
+    settings: KafkaSettings
+) -> None:
+    """Worker task: enrich queued messages and mark them finished for commit."""
+    # Settings are fixed for the worker's lifetime
+    trust_schema = settings.TRUST_PRODUCER_SCHEMA
+    dlq_topic = settings.KAFKA_DLQ_TOPIC
+    source_topic = settings.KAFKA_ENRICHMENT_TOPIC
+    commit_batch_size = settings.KAFKA_COMMIT_BATCH_SIZE
+    loop = asyncio.get_running_loop()
+    
+    def mark_finished(msg) -> None:
+        tracker.finish(msg)
+        if tracker.pending_count >= commit_batch_size:
+            commit_due.set()
+    
+    dlq = DlqPublisher(dlq_producer, dlq_topic, source_topic, loop, mark_finished)
+    
+    while True:
+        msg = await queue.get()
+        try:
+            message_value, success, error = await decode_and_process(msg, store, trust_schema)
+            if not success and message_value is not None:
+                # Move to DLQ instead of retrying indefinitely; the offset is
+                # finished once the DLQ delivery is confirmed
+                if dlq.publish(msg, message_value, error or ""):
+                    logger.warning("Message moved to DLQ")
+                continue
+            
+            # Undecodable messages are committed too, to avoid infinite
+            # reprocessing
+            mark_finished(msg)
+        finally:
+            queue.task_done()
+
+
+async def run_committer(
+    kafka_consumer: Consumer,
+    dlq_producer: Producer,
+    tracker: OffsetTracker,
+    commit_due: asyncio.Event,
+    interval: float
+) -> None:
+    """Committer task: commit finished offsets every interval or once a batch is due."""
+    while True:
+        try:
+            await asyncio.wait_for(commit_due.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        commit_due.clear()
+        tracker.pending_count = 0
+        await commit_offsets(kafka_consumer, dlq_producer, tracker.pending)
+
+
+async def run_consumer(stop_event: Optional[asyncio.Event] = None):
     """
     Main consumer loop - processes enrichment requests from Kafka.
     
-    This runs as a separate service/process from the API.
+    This runs as a separate service/process from the API. Polling, enrichment
+    and offset commits are pipelined: the loop here routes each message to
+    one of KAFKA_WORKER_CONCURRENCY bounded queues by its key, one worker task
+    enriches from each queue, and a committer task commits offsets as their
+    messages finish. Routing by key keeps events for the same user in order.
+    
+    Args:
+        stop_event: Set to stop the loop; SIGINT/SIGTERM set it as well
     """
     settings = KafkaSettings()
     kafka_consumer = create_kafka_consumer(settings, settings.KAFKA_ENRICHMENT_TOPIC)
@@ -230,8 +527,9 @@ async def run_consumer():
     store = get_user_store()
     
     # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    loop = asyncio.get_running_loop()
+    stop_event = stop_event or asyncio.Event()
+    install_shutdown_handlers(loop, stop_event)
     
     logger.info(
         "Starting enrichment worker",
@@ -241,51 +539,63 @@ async def run_consumer():
         }
     )
     
+    tracker = OffsetTracker()
+    # One queue per worker; bounded so polling stays at most two batches
+    # ahead of enrichment
+    queues: List[asyncio.Queue] = [
+        asyncio.Queue(maxsize=2) for _ in range(settings.KAFKA_WORKER_CONCURRENCY)
+    ]
+    commit_due = asyncio.Event()
+    workers = [
+        asyncio.create_task(
+            enrich_from_queue(queue, tracker, commit_due, store, dlq_producer, settings)
+        )
+        for queue in queues
+    ]
+    committer = asyncio.create_task(
+        run_committer(
+            kafka_consumer,
+            dlq_producer,
+            tracker,
+            commit_due,
+            settings.KAFKA_COMMIT_INTERVAL_SECONDS
+        )
+    )
+    
     try:
-        while not shutdown_requested:
-            # Poll for messages (timeout 1 second for graceful shutdown)
-            msg = kafka_consumer.poll(timeout=1.0)
+        while not stop_event.is_set():
+            if committer.done():
+                # Surface a failed commit as a fatal error
+                committer.result()
             
-            if msg is None:
-                continue
-            
-            if msg.error():
-                logger.error(f"Consumer error: {msg.error()}")
-                continue
-            
-            logger.debug(
-                f"Received message from Kafka",
-                extra={
-                    "partition": msg.partition(),
-                    "offset": msg.offset(),
-                    "key": msg.key()
-                }
+            # Fetch messages off the event loop while the workers enrich the
+            # previous ones
+            messages = await asyncio.to_thread(
+                kafka_consumer.consume,
+                num_messages=settings.KAFKA_WORKER_CONCURRENCY,
+                timeout=CONSUME_TIMEOUT_SECONDS
             )
             
-            # Process the message
-            try:
-                message_value = json.loads(msg.value().decode('utf-8'))
-                success, error = await process_enrichment_message(message_value, store)
+            for msg in messages:
+                if msg.error():
+                    logger.error(f"Consumer error: {msg.error()}")
+                    continue
                 
-                if success:
-                    # Commit offset on success
-                    kafka_consumer.commit(msg)
-                    logger.debug(f"Committed offset {msg.offset()}")
-                else:
-                    # Publish to DLQ and commit offset (don't retry indefinitely)
-                    await publish_to_dlq(
-                        dlq_producer,
-                        settings.KAFKA_DLQ_TOPIC,
-                        message_value,
-                        error
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Received message from Kafka",
+                        extra={
+                            "partition": msg.partition(),
+                            "offset": msg.offset(),
+                            "key": msg.key()
+                        }
                     )
-                    kafka_consumer.commit(msg)
-                    logger.warning(f"Message moved to DLQ, offset committed")
-                    
-            except Exception as e:
-                logger.error(f"Error processing message: {e}", exc_info=True)
-                # Commit offset even on error to avoid infinite reprocessing
-                kafka_consumer.commit(msg)
+                tracker.start(msg)
+                await queues[worker_index(msg, len(queues))].put(msg)
+        
+        # Let queued messages finish so their offsets are committed below
+        for queue in queues:
+            await queue.join()
     
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down...")
@@ -294,10 +604,19 @@ async def run_consumer():
         logger.error(f"Fatal error in consumer loop: {e}", exc_info=True)
     
     finally:
+        for task in (*workers, committer):
+            task.cancel()
+        await asyncio.gather(*workers, committer, return_exceptions=True)
+        remove_shutdown_handlers(loop)
         logger.info("Closing Kafka consumer and producer...")
+        try:
+            await commit_offsets(kafka_consumer, dlq_producer, tracker.pending, asynchronous=False)
+        except Exception as e:
+            logger.error(f"Failed to commit offsets on shutdown: {e}")
         kafka_consumer.close()
-        dlq_producer.flush()
+        dlq_producer.flush(DLQ_FLUSH_TIMEOUT_SECONDS)
         store.close() if hasattr(store, 'close') else None
+        await close_okta_clients()
         logger.info("Worker shutdown complete")
 
 
@@ -305,4 +624,9 @@ if __name__ == "__main__":
     from app.logging_config import setup_logging
     setup_logging()
     
+    # The worker is I/O-bound; uvloop's libuv-based loop handles the Okta
+    # HTTP traffic and thread hand-offs with less overhead
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    
     asyncio.run(run_consumer())